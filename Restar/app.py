@@ -1,14 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
-import pandas as pd
 import os
 import math
+import uuid
 import logging
 
 # Local imports
 from Restar.models import *
+from Restar.cache import shared_ttl_cache
+from Restar.etl import find_catalog, read_catalog
 from Restar.recommender import DualRecommender
+from Restar.shared_model import MODEL_DIR_ENV, attach_model, process_memory
+from Restar.sessions import SessionStore
+from Restar.shadow import load_shadow_scorer
+from Restar.singleflight import SingleFlight
+from Restar.static_assets import load_site
 
 # Initialize logger
 logging.basicConfig(
@@ -34,15 +43,35 @@ app.add_middleware(
 
 # Load dataset and initialize recommender
 try:
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(current_dir, 'merged_file_all.csv')
-    df = pd.read_csv(csv_path, encoding="latin1")    
-    recommender = DualRecommender(df)
-    logger.info("Dataset loaded and recommender initialized.")
+    model_dir = os.environ.get(MODEL_DIR_ENV)
+    if model_dir:
+        # Started by Restar/serve.py: attach to the model published by the launcher
+        recommender = attach_model(model_dir)
+    else:
+        recommender = DualRecommender(read_catalog(find_catalog()))
+    df = recommender.df
+    logger.info(f"Dataset loaded and recommender initialized. Memory: {process_memory()}")
 except Exception as e:
     logger.exception("Failed to load dataset or initialize recommender.")
     raise RuntimeError("Initialization error: could not load dataset or recommender.")
 
+# Favorite dishes per recommendation_id, so more similar dishes can be paged in later.
+# Under Restar/serve.py this lives in a database shared by all workers, since the
+# follow-up request may land on a different worker than the first one.
+similar_dish_queries = shared_ttl_cache('similar_dish_queries', maxsize=10000, ttl=3600)
+
+# Identical concurrent /recommendations/ requests share one computation
+single_flight = SingleFlight()
+
+# Incremental per-user selections; each session is updated by one request at a time
+sessions = SessionStore(recommender)
+
+# Alternative weight configs scored alongside production when WHERETODINE_SHADOW_CONFIG is set
+shadow_scorer = load_shadow_scorer(recommender)
+
+# Fingerprinted front end, present once `python -m Restar.static_assets` has been run
+site = load_site()
+
 def clean_dict(obj):
     """Replace NaN and Inf with None for JSON serialization."""
     for key, value in obj.items():
@@ -50,6 +79,22 @@ def clean_dict(obj):
             obj[key] = None
     return obj
 
+def _parse_cursor(cursor):
+    """Cursors are opaque to clients; internally they are result offsets."""
+    if cursor is None:
+        return 0
+    if not cursor.isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    return int(cursor)
+
+def similar_dishes_page(dish_names, cursor, limit):
+    """Return one page of similar dishes and the cursor of the next page, if any."""
+    offset = _parse_cursor(cursor)
+    # Ask for one extra match to learn whether another page exists
+    items = recommender.find_similar_menu_items(dish_names, limit=limit + 1, offset=offset)
+    next_cursor = str(offset + limit) if len(items) > limit else None
+    return items[:limit], next_cursor
+
 @app.get("/cafe-names/")
 async def get_cafe_names():
     """Endpoint to return the list of cafe names."""
@@ -61,71 +106,237 @@ async def get_cafe_names():
         logger.exception("Failed to fetch cafe names.")
         raise HTTPException(status_code=500, detail=str(e))
 
+def compute_recommendations(restaurant_names, favorite_dish_names, limit, cursor):
+    """Score and format recommendations; shared by all coalesced requests, so never mutated afterwards.
+
+    Returns the response body and the inputs of the production ranking, which
+    each request hands to the shadow scorer on its own.
+    """
+    # Map selected restaurant names to indices
+    selected_indices = []
+    for name in restaurant_names:
+        idx = recommender.find_restaurant(name)
+        if idx is not None:
+            selected_indices.append(idx)
+        else:
+            logger.warning(f"Restaurant not found: {name}")
+            raise HTTPException(status_code=404, detail=f"Restaurant not found: {name}")
+
+    # Similarity vectors are computed once and shared by the production and shadow blends
+    feature_similarities = recommender.feature_similarities(selected_indices)
+    menu_similarities = None
+    similar_dishes = []
+    next_cursor = None
+
+    if favorite_dish_names:
+        menu_similarities = recommender.menu_similarities(favorite_dish_names)
+        similar_dishes, next_cursor = similar_dishes_page(favorite_dish_names, cursor, limit)
+        logger.info(f"Menu-based recommendations generated for dishes: {favorite_dish_names}")
+
+    final_recommendations = recommender.recommend_from_similarities(
+        selected_indices, feature_similarities, menu_similarities)
+
+    result = {
+        'recommended_restaurants': format_recommendations(final_recommendations),
+        'similar_dishes': similar_dishes,
+        'next_cursor': next_cursor
+    }
+    return result, (selected_indices, feature_similarities, menu_similarities, final_recommendations)
+
+def format_recommendations(final_recommendations):
+    """Turn (index, score) pairs into the restaurant records returned by the API."""
+    recommended_restaurants = []
+    for idx, score in final_recommendations:
+        restaurant = df.iloc[idx]
+        restaurant_data = {
+            'name': restaurant['name'],
+            'address': restaurant['address'],
+            'cuisines': restaurant['cuisines'],
+            'votes': restaurant['votes'],
+            'avg_price': int(round(restaurant['avg_price'])),
+            'positive_ratio': float(restaurant['positive_ratio']),
+            'total_reviews': int(restaurant['total_reviews']),
+            'highlights': restaurant['highlights'],
+            'similarity_score': float(score)
+        }
+        recommended_restaurants.append(clean_dict(restaurant_data))
+    return recommended_restaurants
+
 @app.post("/recommendations/", response_model=RecommendationResponse)
 async def get_recommendations(request: RecommendationRequest):
     """Endpoint to get restaurant recommendations."""
     try:
-        recommendation_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        recommendation_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         logger.info(f"Processing recommendation request ID: {recommendation_id}")
 
-        # Map selected restaurant names to indices
-        selected_indices = []
-        for restaurant in request.restaurants:
-            idx = recommender.find_restaurant(restaurant.name)
-            if idx is not None:
-                selected_indices.append(idx)
-            else:
-                logger.warning(f"Restaurant not found: {restaurant.name}")
-                raise HTTPException(status_code=404, detail=f"Restaurant not found: {restaurant.name}")
-
-        # Generate recommendations
-        feature_recs = recommender.feature_based_recommendations(selected_indices)
-        menu_recs = []
-        similar_dishes = []
-
-        if request.favorite_dishes:
-            favorite_dish_names = [dish.name for dish in request.favorite_dishes]
-            menu_recs = recommender.menu_based_recommendations(favorite_dish_names)
-            similar_dishes = recommender.find_similar_menu_items(favorite_dish_names)
-            logger.info(f"Menu-based recommendations generated for dishes: {favorite_dish_names}")
-
-        final_recommendations = recommender.combine_recommendations(feature_recs, menu_recs)
-
-        # Format response
-        recommended_restaurants = []
-        for idx, score in final_recommendations:
-            restaurant = df.iloc[idx]
-            sentiments = restaurant['sentiment_scores']
-            restaurant_data = {
-                'name': restaurant['name'],
-                'address': restaurant['address'],
-                'cuisines': restaurant['cuisines'],
-                'votes': restaurant['votes'],
-                'avg_price': int(round(restaurant['avg_price'])),
-                'positive_ratio': sentiments['positive_ratio'],
-                'total_reviews': sentiments['total_reviews'],
-                'highlights': restaurant['highlights'],
-                'similarity_score': float(score)
-            }
-            recommended_restaurants.append(clean_dict(restaurant_data))
-
-        logger.info(f"Returning {len(recommended_restaurants)} recommendations for ID: {recommendation_id}")
-
-        return {
-            'recommendation_id': recommendation_id,
-            'recommended_restaurants': recommended_restaurants,
-            'similar_dishes': similar_dishes
-        }
-
+        # find_restaurant ignores case and surrounding whitespace, so the key does too;
+        # dish names are echoed back as original_dish and must match exactly
+        restaurant_names = [restaurant.name for restaurant in request.restaurants]
+        favorite_dish_names = [dish.name for dish in request.favorite_dishes or []]
+        key = (
+            tuple(name.lower().strip() for name in restaurant_names),
+            tuple(favorite_dish_names),
+            request.limit,
+            request.cursor,
+        )
+        result, ranking = await single_flight.do(
+            key, compute_recommendations, restaurant_names, favorite_dish_names, request.limit, request.cursor
+        )
+
+        # Sampled per request, so coalesced requests are observed like any other
+        if shadow_scorer is not None:
+            shadow_scorer.observe(restaurant_names, favorite_dish_names, *ranking)
+
+        if favorite_dish_names:
+            await run_in_threadpool(similar_dish_queries.set, recommendation_id, favorite_dish_names)
+
+        logger.info(f"Returning {len(result['recommended_restaurants'])} recommendations for ID: {recommendation_id}")
+
+        return {'recommendation_id': recommendation_id, **result}
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to generate recommendations.")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/recommendations/{recommendation_id}/similar-dishes", response_model=SimilarDishesPage)
+async def get_more_similar_dishes(
+    recommendation_id: str,
+    cursor: str = Query(None),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Endpoint to page through the similar dishes of an earlier recommendation."""
+    favorite_dish_names = await run_in_threadpool(similar_dish_queries.get, recommendation_id)
+    if favorite_dish_names is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired recommendation: {recommendation_id}")
+    try:
+        similar_dishes, next_cursor = await run_in_threadpool(similar_dishes_page, favorite_dish_names, cursor, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to fetch similar dishes.")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        'recommendation_id': recommendation_id,
+        'similar_dishes': similar_dishes,
+        'next_cursor': next_cursor
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+def session_response(session):
+    """Current selection of a session and its refreshed top recommendations."""
+    return {
+        'session_id': session.session_id,
+        'restaurants': [str(df.iloc[idx]['name']) for idx in session.restaurants],
+        'favorite_dishes': list(session.dishes),
+        'recommended_restaurants': format_recommendations(session.recommendations())
+    }
+
+async def session_request(session_id, update=None):
+    """Apply `update` to a session and build its response in the threadpool.
+
+    Scoring stays off the event loop. The session lock keeps concurrent
+    requests on one session in this worker from interleaving their updates,
+    and the shared session state does the same across workers.
+    """
+    session = sessions.local(session_id)
+
+    def run():
+        found = sessions.update(session, update) if update is not None else sessions.refresh(session)
+        if not found:
+            raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+        return session_response(session)
+
+    async with session.lock:
+        return await run_in_threadpool(run)
+
+@app.post("/sessions/", response_model=SessionResponse)
+async def create_session():
+    """Start an empty session that is scored incrementally as the selection grows."""
+    session = await run_in_threadpool(sessions.create)
+    logger.info(f"Created session {session.session_id}")
+    return await session_request(session.session_id)
+
+@app.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Return the current selection and recommendations of a session."""
+    return await session_request(session_id)
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Discard a session before it expires."""
+    if not await run_in_threadpool(sessions.delete, session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+    return {"status": "deleted"}
+
+@app.post("/sessions/{session_id}/restaurants", response_model=SessionResponse)
+async def add_session_restaurant(session_id: str, restaurant: Restaurant):
+    """Add a restaurant to a session and return the refreshed recommendations."""
+    def add(session):
+        idx = recommender.find_restaurant(restaurant.name)
+        if idx is None:
+            raise HTTPException(status_code=404, detail=f"Restaurant not found: {restaurant.name}")
+        session.add_restaurant(idx)
+
+    return await session_request(session_id, add)
+
+@app.delete("/sessions/{session_id}/restaurants/{restaurant_name}", response_model=SessionResponse)
+async def remove_session_restaurant(session_id: str, restaurant_name: str):
+    """Remove a restaurant from a session and return the refreshed recommendations."""
+    def remove(session):
+        idx = recommender.find_restaurant(restaurant_name)
+        if idx is None or not session.remove_restaurant(idx):
+            raise HTTPException(status_code=404, detail=f"Restaurant not in session: {restaurant_name}")
+
+    return await session_request(session_id, remove)
+
+@app.post("/sessions/{session_id}/dishes", response_model=SessionResponse)
+async def add_session_dish(session_id: str, dish: Dish):
+    """Add a favorite dish to a session and return the refreshed recommendations."""
+    return await session_request(session_id, lambda session: session.add_dish(dish.name))
+
+@app.delete("/sessions/{session_id}/dishes/{dish_name}", response_model=SessionResponse)
+async def remove_session_dish(session_id: str, dish_name: str):
+    """Remove a favorite dish from a session and return the refreshed recommendations."""
+    def remove(session):
+        if not session.remove_dish(dish_name):
+            raise HTTPException(status_code=404, detail=f"Dish not in session: {dish_name}")
+
+    return await session_request(session_id, remove)
+
+@app.get("/metrics")
+async def metrics():
+    """Counters for request coalescing, sessions and shadow scoring."""
+    return {
+        'single_flight': single_flight.stats(),
+        'active_sessions': await run_in_threadpool(len, sessions),
+        'shadow': shadow_scorer.stats() if shadow_scorer is not None else None
+    }
+
+@app.get("/memory")
+async def memory_usage():
+    """Report resident memory of the worker that served this request."""
+    usage = process_memory()
+    usage['shared_model_dir'] = os.environ.get(MODEL_DIR_ENV)
+    usage['model'] = recommender.memory_report()
+    return usage
+
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+async def root():
+    return RedirectResponse("/site/")
+
+@app.api_route("/site/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_site(path: str, request: Request):
+    """Serve the built front end with immutable caching and precompressed variants."""
+    if site is None:
+        raise HTTPException(status_code=404, detail="Static site not built; run `python -m Restar.static_assets`")
+    return site.response(path, request)
+
 # import logging
 # from fastapi import FastAPI, HTTPException
 # from pydantic import BaseModel
@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+STATE_DB_ENV = "WHERETODINE_STATE_DB"
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after they were last used.
+
+    Reads and writes both refresh an entry, so insertion order is also expiry
+    order; when full, the least recently used entry is evicted. Safe to share
+    between the event loop and threadpool workers.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        """Drop expired entries; the least recently used are at the front"""
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._data[key] = (now + self.ttl, entry[1])
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._data.pop(key, None)
+            self._data[key] = (now + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def __len__(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._data)
+
+
+class SharedTTLCache:
+    """TTLCache kept in a SQLite table, so every worker process sees the same entries.
+
+    Values are stored as JSON and follow TTLCache's rules: reads and writes
+    refresh an entry and the least recently used entries are evicted when the
+    table is full. With `path=None` the table lives in memory and is private
+    to this process.
+    """
+
+    def __init__(self, path, table, maxsize, ttl):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock() if path is None else None
+        self._memory = None
+        self._execute_script(
+            f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL);'
+            f'CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires);')
+
+    def _connection(self):
+        if self.path is None:
+            if self._memory is None:
+                self._memory = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+            return self._memory
+        # SQLite connections are not shared between threads; each thread opens its own
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the write lock for the block; other threads and processes wait for it"""
+        if self._lock is not None:
+            self._lock.acquire()
+        try:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        finally:
+            if self._lock is not None:
+                self._lock.release()
+
+    def _execute_script(self, script):
+        if self._lock is not None:
+            with self._lock:
+                self._connection().executescript(script)
+        else:
+            self._connection().executescript(script)
+
+    def _expire(self, connection, now):
+        connection.execute(f'DELETE FROM {self.table} WHERE expires <= ?', (now,))
+
+    def _read(self, connection, key, now):
+        self._expire(connection, now)
+        row = connection.execute(f'SELECT value FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute(f'UPDATE {self.table} SET expires = ? WHERE key = ?', (now + self.ttl, key))
+        return json.loads(row[0])
+
+    def _write(self, connection, key, value, now):
+        connection.execute(f'INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)',
+                           (key, json.dumps(value), now + self.ttl))
+        connection.execute(
+            f'DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY expires '
+            f'LIMIT max(0, (SELECT COUNT(*) FROM {self.table}) - ?))', (self.maxsize,))
+
+    def get(self, key, default=None):
+        with self._transaction() as connection:
+            value = self._read(connection, key, time.time())
+        return default if value is None else value
+
+    def set(self, key, value):
+        with self._transaction() as connection:
+            now = time.time()
+            self._expire(connection, now)
+            self._write(connection, key, value, now)
+
+    def pop(self, key, default=None):
+        with self._transaction() as connection:
+            row = connection.execute(f'SELECT value FROM {self.table} WHERE key = ? AND expires > ?',
+                                     (key, time.time())).fetchone()
+            connection.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+        return default if row is None else json.loads(row[0])
+
+    @contextmanager
+    def locked(self, key):
+        """Yield the value of `key` (None if absent) with the store locked; a value
+        assigned to the yielded holder's `value` is written back on exit"""
+        with self._transaction() as connection:
+            now = time.time()
+            holder = _Holder(self._read(connection, key, now))
+            original = holder.value
+            yield holder
+            if holder.value is not original:
+                self._write(connection, key, holder.value, now)
+
+    def __len__(self):
+        with self._transaction() as connection:
+            now = time.time()
+            self._expire(connection, now)
+            return connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+
+class _Holder:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def shared_ttl_cache(table, maxsize, ttl):
+    """SharedTTLCache in the database named by WHERETODINE_STATE_DB (set by the
+    multi-worker launcher), or in this process's memory when it is unset"""
+    return SharedTTLCache(os.environ.get(STATE_DB_ENV), table, maxsize, ttl)
@@ -0,0 +1,190 @@
+import ast
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Common location identifiers and branch indicators, applied in this order
+LOCATION_INDICATORS = [
+    re.compile(pattern, flags=re.IGNORECASE) for pattern in (
+        r'\b(branch)\b', r'\b(outlet)\b', r'-.*$', r'\(.*\)',
+        r',.*$', r'\d+(?:st|nd|rd|th).*$'
+    )
+]
+NON_ALNUM = re.compile(r'[^a-zA-Z0-9\s]')
+
+# Raw columns a chunk worker needs; everything else stays in the parent process
+SOURCE_COLUMNS = ['name', 'cuisines', 'address', 'establishment', 'highlights', 'Food Sentiments', 'Menu']
+FEATURE_COLUMNS = ['cuisines', 'address', 'establishment', 'highlights']
+
+
+def extract_base_names(names):
+    """Extract base restaurant names by removing location identifiers"""
+    for indicator in LOCATION_INDICATORS:
+        names = names.str.replace(indicator, '', regex=True)
+    return names.str.strip()
+
+
+def process_food_sentiments(sentiments_str):
+    """Process food sentiments from string format"""
+    try:
+        if pd.isna(sentiments_str):
+            return {'positive_ratio': 0, 'total_reviews': 0}
+
+        # Convert string to dictionary
+        sentiments_dict = ast.literal_eval(sentiments_str)
+
+        # Calculate total positive and negative reviews
+        total_positive = sum(item.get('positive', 0) for item in sentiments_dict.values())
+        total_negative = sum(item.get('negative', 0) for item in sentiments_dict.values())
+        total = total_positive + total_negative
+
+        return {
+            'positive_ratio': total_positive / total if total > 0 else 0,
+            'total_reviews': total
+        }
+    except:
+        return {'positive_ratio': 0, 'total_reviews': 0}
+
+
+def parse_menu_entries(menu_str):
+    """Parse a Menu literal into (item, veg_status, price) tuples, or nothing if malformed"""
+    try:
+        if pd.isna(menu_str):
+            return []
+        menu_dict = ast.literal_eval(menu_str) if isinstance(menu_str, str) else menu_str
+        return [(item_name, veg_status, float(price))
+                for item_name, (veg_status, price) in menu_dict.items()]
+    except:
+        return []
+
+
+def combine_features(chunk, avg_price):
+    """Combine restaurant features into a single lower-cased string per row"""
+    combined = pd.Series('', index=chunk.index, dtype=object)
+    for column in FEATURE_COLUMNS:
+        values = chunk[column]
+        combined += values.astype(object).where(values.notna(), '').astype(str) + ' '
+
+    # Add price range indicator based on average price
+    price_level = np.select(
+        [avg_price <= 0, avg_price < 300, avg_price < 600],
+        ['', 'budget', 'mid_range'],
+        default='expensive'
+    )
+    combined += price_level
+
+    return combined.str.lower().str.replace(NON_ALNUM, ' ', regex=True).tolist()
+
+
+def parse_chunk(chunk):
+    """Parse names, sentiments, menus and feature text of one slice of the catalog.
+
+    Item names and veg statuses are interned per chunk (in first-seen order)
+    so the parent can merge chunks into global codes deterministically.
+    """
+    started = time.perf_counter()
+
+    cleaned_name = chunk['name'].astype(str).replace("", "\\")
+
+    sentiments = [process_food_sentiments(value) for value in chunk['Food Sentiments']]
+
+    item_codes, veg_codes = {}, {}
+    counts, item_ids, prices, veg, menu_text = [], [], [], [], []
+    avg_price = np.zeros(len(chunk), dtype=np.float64)
+    for row, menu_str in enumerate(chunk['Menu']):
+        entries = parse_menu_entries(menu_str)
+        row_prices = []
+        for item_name, veg_status, price in entries:
+            item_ids.append(item_codes.setdefault(item_name, len(item_codes)))
+            veg.append(veg_codes.setdefault(veg_status, len(veg_codes)))
+            prices.append(price)
+            if price > 0:
+                row_prices.append(price)
+        counts.append(len(entries))
+        menu_text.append(' '.join(item_name.lower() for item_name, _, _ in entries))
+        if row_prices:
+            avg_price[row] = np.mean(row_prices)
+
+    return {
+        'cleaned_name': cleaned_name.tolist(),
+        'base_name': extract_base_names(cleaned_name).tolist(),
+        'positive_ratio': np.array([s['positive_ratio'] for s in sentiments], dtype=np.float64),
+        'total_reviews': np.array([s['total_reviews'] for s in sentiments], dtype=np.int32),
+        'avg_price': avg_price,
+        'combined_features': combine_features(chunk, avg_price),
+        'menu_text': menu_text,
+        'menu_counts': np.array(counts, dtype=np.int32),
+        'item_names': list(item_codes),
+        'item_ids': np.array(item_ids, dtype=np.int32),
+        'prices': np.array(prices, dtype=np.float64),
+        'veg_names': list(veg_codes),
+        'veg_codes': np.array(veg, dtype=np.int8),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _merge_codes(global_codes, local_names, local_ids, dtype):
+    """Translate chunk-local interned codes into global ones"""
+    remap = np.array([global_codes.setdefault(name, len(global_codes)) for name in local_names], dtype=dtype)
+    return remap[local_ids] if len(local_ids) else local_ids.astype(dtype)
+
+
+def build_catalog(df, n_jobs=1, chunk_size=500, timings=None):
+    """Parse the raw catalog in chunks, optionally in a process pool, and merge the results.
+
+    Chunks are merged in catalog order, so the output is identical for any
+    `n_jobs` or `chunk_size`. Per-stage wall times are written to `timings`.
+    """
+    timings = timings if timings is not None else {}
+    n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(1, n_jobs)
+
+    started = time.perf_counter()
+    source = df.reindex(columns=SOURCE_COLUMNS)
+    chunks = [source.iloc[start:start + chunk_size] for start in range(0, len(source), chunk_size)]
+    if n_jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as pool:
+            parts = list(pool.map(parse_chunk, chunks))
+    else:
+        parts = [parse_chunk(chunk) for chunk in chunks]
+    timings['parse'] = time.perf_counter() - started
+    timings['parse_cpu'] = sum(part['seconds'] for part in parts)
+
+    started = time.perf_counter()
+    item_codes, veg_codes = {}, {}
+    item_ids, veg = [], []
+    for part in parts:
+        item_ids.append(_merge_codes(item_codes, part['item_names'], part['item_ids'], np.int32))
+        veg.append(_merge_codes(veg_codes, part['veg_names'], part['veg_codes'], np.int8))
+
+    def concat(key, dtype):
+        return np.concatenate([part[key] for part in parts]) if parts else np.array([], dtype=dtype)
+
+    def chain(key):
+        return [value for part in parts for value in part[key]]
+
+    catalog = {
+        'cleaned_name': chain('cleaned_name'),
+        'base_name': chain('base_name'),
+        'positive_ratio': concat('positive_ratio', np.float64),
+        'total_reviews': concat('total_reviews', np.int32),
+        'avg_price': concat('avg_price', np.float64),
+        'combined_features': chain('combined_features'),
+        'menu_text': chain('menu_text'),
+        'menu_offsets': np.concatenate([[0], np.cumsum(concat('menu_counts', np.int32))]).astype(np.int32),
+        'menu_item_ids': np.concatenate(item_ids) if item_ids else np.array([], dtype=np.int32),
+        'menu_prices': concat('prices', np.float64),
+        'menu_veg_codes': np.concatenate(veg) if veg else np.array([], dtype=np.int8),
+        'menu_items': list(item_codes),
+        'veg_statuses': list(veg_codes),
+    }
+    timings['merge'] = time.perf_counter() - started
+
+    logger.info(f"Parsed {len(source)} restaurants in {len(chunks)} chunks with {n_jobs} process(es)")
+    return catalog
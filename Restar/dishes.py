@@ -0,0 +1,174 @@
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+from Restar.strings import StringTable
+
+# Bracketed or trailing quantities such as "(8 pcs)", "[250 grams]" or "[Regular]"
+QUANTITY_WORDS = (r'pcs?|pieces?|cups?|g|gm|gms|grams?|kg|ml|l|ltr|litres?|liters?|inch(?:es)?|'
+                  r'serves?|plates?|nos?|portions?')
+SIZE_WORDS = r'regular|small|medium|large|half|full|mini|jumbo|single|double'
+BRACKETED_QUANTITY = re.compile(
+    rf'[(\[]\s*(?:\d[\d./]*\s*(?:{QUANTITY_WORDS})?\.?|{SIZE_WORDS})\s*[)\]]', re.IGNORECASE)
+TRAILING_QUANTITY = re.compile(rf'\b\d[\d./]*\s*(?:{QUANTITY_WORDS})\b\.?', re.IGNORECASE)
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Spellings of one dish score at least this with fuzz.ratio, and so does
+# each pair of aligned words (so "paneer tikka" ~ "panner tikka" but not
+# "chicken fry" ~ "chicken curry")
+CLUSTER_THRESHOLD = 90
+WORD_THRESHOLD = 75
+
+def normalize_dish(name):
+    """Lower-cased dish name without quantities, sizes or punctuation"""
+    name = BRACKETED_QUANTITY.sub(' ', str(name))
+    name = TRAILING_QUANTITY.sub(' ', name).lower().replace('&', ' and ')
+    return NON_ALNUM.sub(' ', name).strip()
+
+
+def ratio_upper_bounds(query, names):
+    """Upper bound of fuzz.ratio(query, name) for every name of a StringTable.
+
+    fuzz.ratio is 2 * matching characters / total length, and the matching
+    characters are at most the overlap of the two character counts, taken
+    here in one pass over the packed bytes. Names or queries that are not
+    ASCII are bounded by 100.
+    """
+    bounds = np.full(len(names), 100.0)
+    if not query.isascii():
+        return bounds
+    query_counts = Counter(query.encode())
+    slots = np.full(256, len(query_counts), dtype=np.intp)  # bytes not in the query share the last slot
+    slots[list(query_counts)] = np.arange(len(query_counts))
+
+    width = len(query_counts) + 1
+    lengths = np.diff(names.offsets)
+    owners = np.repeat(np.arange(len(names)), lengths)
+    counts = np.bincount(owners * width + slots[names.data], minlength=len(names) * width)
+    overlap = np.minimum(counts.reshape(len(names), width)[:, :-1], list(query_counts.values())).sum(axis=1)
+
+    ascii_names = np.bincount(owners[names.data >= 128], minlength=len(names)) == 0
+    bounds[ascii_names] = 200 * overlap[ascii_names] / np.maximum(lengths[ascii_names] + len(query), 1)
+    return bounds
+
+
+def _blocking_key(normalized):
+    """Initials of every word: aligned words of one dish must start alike, so
+    only names with the same initials (and hence word count) are compared"""
+    return tuple(word[0] for word in normalized.split(' '))
+
+
+def _same_dish(name, leader):
+    # fuzz.ratio is at most 2 * shorter / (len(name) + len(leader)), rounded,
+    # so most leaders are ruled out by length alone
+    if 200 * min(len(name), len(leader)) < (CLUSTER_THRESHOLD - 0.5) * (len(name) + len(leader)):
+        return False
+    if not all(fuzz.ratio(word, other) >= WORD_THRESHOLD
+               for word, other in zip(name.split(' '), leader.split(' '))):
+        return False
+    return fuzz.ratio(name, leader) >= CLUSTER_THRESHOLD
+
+
+def _cluster_block(names):
+    """Leader clustering of one block, `names` in visiting order; returns the
+    position of each name's leader"""
+    leaders, by_name, assignment = [], {}, []
+    for position, name in enumerate(names):
+        leader = by_name.get(name)
+        if leader is None:
+            leader = next((other for leader_name, other in leaders if _same_dish(name, leader_name)), position)
+            if leader == position:
+                leaders.append((name, position))
+            by_name[name] = leader
+        assignment.append(leader)
+    return assignment
+
+
+def cluster_dishes(items, counts, n_jobs=1):
+    """Group spellings of the same dish.
+
+    Names are visited from most to least frequent and join the first leader
+    in their block they match; otherwise they lead a new dish, so each dish is
+    named after its most common spelling. Blocks are independent and may be
+    clustered in a process pool; dish ids are numbered afterwards in visiting
+    order, so the result is the same for any `n_jobs`. Returns the dish id of
+    every item, the item id naming each dish, the dishes' normalized forms and
+    a dict from every normalized spelling to its dish id.
+    """
+    normalized = [normalize_dish(item) for item in items]
+    order = sorted(range(len(items)), key=lambda i: (-counts[i], normalized[i], items[i]))
+
+    blocks = defaultdict(list)  # blocking key -> item indices in visiting order
+    for i in order:
+        if normalized[i]:
+            blocks[_blocking_key(normalized[i])].append(i)
+    blocks = list(blocks.values())
+    names = [[normalized[i] for i in block] for block in blocks]
+    n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(1, n_jobs)
+    if n_jobs > 1 and len(names) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            assignments = list(pool.map(_cluster_block, names, chunksize=max(1, len(names) // (4 * n_jobs))))
+    else:
+        assignments = [_cluster_block(block_names) for block_names in names]
+    leader_of = {i: block[leader] for block, assignment in zip(blocks, assignments)
+                 for i, leader in zip(block, assignment)}
+
+    item_dish_ids = np.empty(len(items), dtype=np.int32)
+    dish_leaders, dish_keys = [], []
+    dish_ids_by_key = {}
+    for i in order:
+        # Nothing left after normalization: the item is kept as its own dish
+        leader = leader_of.get(i, i)
+        if leader == i:
+            item_dish_ids[i] = len(dish_leaders)
+            dish_leaders.append(i)
+            dish_keys.append(normalized[i] or str(items[i]).lower())
+        else:
+            item_dish_ids[i] = item_dish_ids[leader]
+        if normalized[i]:
+            dish_ids_by_key.setdefault(normalized[i], int(item_dish_ids[i]))
+    return item_dish_ids, np.array(dish_leaders, dtype=np.int32), dish_keys, dish_ids_by_key
+
+
+def build_dish_index(menu_items, menu_item_ids, menu_prices, n_jobs=1):
+    """Canonical dishes with CSR posting lists over the flat menu arrays.
+
+    The postings of dish d are dish_postings[dish_offsets[d]:dish_offsets[d + 1]],
+    positions in the flat menu arrays in ascending (and so restaurant) order.
+    Every normalized spelling maps to its dish through the sorted
+    spelling_keys table and the parallel spelling_dish_ids.
+    """
+    counts = Counter(menu_item_ids.tolist())
+    item_dish_ids, dish_leaders, dish_keys, dish_ids_by_key = cluster_dishes(
+        menu_items, [counts[i] for i in range(len(menu_items))], n_jobs=n_jobs)
+
+    dish_ids = item_dish_ids[menu_item_ids]
+    order = np.argsort(dish_ids, kind='stable').astype(np.int32)
+    dish_offsets = np.zeros(len(dish_leaders) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(dish_ids, minlength=len(dish_leaders)), out=dish_offsets[1:])
+
+    posting_prices = menu_prices[order]
+    price_stats = np.full((len(dish_leaders), 3), np.nan)
+    for dish_id in np.flatnonzero(np.diff(dish_offsets)):
+        prices = posting_prices[dish_offsets[dish_id]:dish_offsets[dish_id + 1]]
+        prices = prices[prices > 0]
+        if len(prices):
+            price_stats[dish_id] = (prices.min(), np.median(prices), prices.max())
+
+    spellings = sorted(dish_ids_by_key)
+    return {
+        'dish_leaders': dish_leaders,
+        'dish_keys': StringTable.from_strings(dish_keys),
+        'spelling_keys': StringTable.from_strings(spellings),
+        'spelling_dish_ids': np.array([dish_ids_by_key[spelling] for spelling in spellings], dtype=np.int32),
+        'item_dish_ids': item_dish_ids,
+        'dish_offsets': dish_offsets,
+        'dish_postings': order,
+        'dish_price_min': price_stats[:, 0],
+        'dish_price_median': price_stats[:, 1],
+        'dish_price_max': price_stats[:, 2],
+    }
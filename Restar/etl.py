@@ -0,0 +1,281 @@
+# etl.py
+#
+# Builds the serving catalog (merged_file_all) from the exports in Dataset/.
+#
+#   python -m Restar.etl                    # incremental: only changed inputs are reprocessed
+#   python -m Restar.etl --force --format csv
+#
+# Sources are streamed in chunks; padding rows and duplicates within a chunk
+# are dropped as it is read, and the chunks are merged once at the end, so
+# memory is bounded by the cleaned rows rather than the raw inputs. Each
+# input's cleaned result is cached under its content hash, and the output is
+# written with a manifest holding a hash of its content.
+
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow  # noqa: F401  (pandas' Parquet engine; imported here so a missing install fails up front)
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(os.path.dirname(CURRENT_DIR), 'Dataset')
+DEFAULT_RESTAURANTS = os.path.join(DATASET_DIR, 'merged_restaurant_data.csv')
+DEFAULT_COORDINATES = os.path.join(DATASET_DIR, 'filtered_dataset.csv')
+DEFAULT_CACHE_DIR = os.path.join(CURRENT_DIR, '.etl_cache')
+CATALOG_BASENAME = os.path.join(CURRENT_DIR, 'merged_file_all')
+
+# Bump when the cleaning rules change so cached stages are not reused
+PIPELINE_VERSION = 1
+
+# Join artifacts of the review scrape that the serving catalog does not need
+DROPPED_COLUMNS = ['Index', 'name_x', 'name_y', 'Restaurant', 'cleaned_restaurant']
+COORDINATE_COLUMNS = ['res_id', 'latitude', 'longitude']
+
+DEFAULT_FORMAT = 'parquet'
+
+
+def find_catalog(basename=CATALOG_BASENAME):
+    """Path of the built catalog, preferring the columnar copy"""
+    for ext in ('.parquet', '.csv'):
+        if os.path.exists(basename + ext):
+            return basename + ext
+    return basename + '.csv'
+
+
+def read_catalog(path):
+    """Load a catalog written by this pipeline (or a legacy merged_file_all.csv)"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, encoding="latin1")
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_url(urls):
+    """Lower-cased URL without query string, fragment or trailing slash"""
+    return (urls.astype(object).where(urls.notna(), '').astype(str).str.strip().str.lower()
+            .str.split('?').str[0].str.split('#').str[0].str.rstrip('/'))
+
+
+def normalize_names(chunk):
+    """Restaurant name from name_x, falling back to the review page title in name_y"""
+    names = chunk['name_x'] if 'name_x' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+    if 'name_y' in chunk.columns:
+        from_reviews = chunk['name_y'].str.replace(r'^\s*Reviews of\s+', '', regex=True)
+        names = names.where(names.notna(), from_reviews)
+    return names.str.replace(r'\s+', ' ', regex=True).str.strip().replace('', np.nan)
+
+
+def validate_menu(menu_str):
+    """Canonical Menu literal ({item: (veg_status, price)}) and the number of entries dropped"""
+    if pd.isna(menu_str):
+        return np.nan, 0
+    try:
+        menu = ast.literal_eval(menu_str) if isinstance(menu_str, str) else menu_str
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return np.nan, 1
+    if not isinstance(menu, dict):
+        return np.nan, 1
+
+    valid = {}
+    for item, entry in menu.items():
+        try:
+            veg_status, price = entry
+            price = float(price)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(item, str) and item.strip() and isinstance(veg_status, str) and np.isfinite(price) and price >= 0:
+            valid[item.strip()] = (veg_status, price)
+    dropped = len(menu) - len(valid)
+    return (repr(valid) if valid else np.nan), dropped
+
+
+def validate_sentiments(sentiments_str):
+    """Canonical Food Sentiments JSON ({aspect: {positive, negative}}), or NaN if malformed"""
+    if pd.isna(sentiments_str):
+        return np.nan
+    try:
+        sentiments = ast.literal_eval(sentiments_str) if isinstance(sentiments_str, str) else sentiments_str
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return np.nan
+    if not isinstance(sentiments, dict):
+        return np.nan
+    for counts in sentiments.values():
+        if not isinstance(counts, dict):
+            return np.nan
+        if not all(isinstance(counts.get(key, 0), int) and counts.get(key, 0) >= 0 for key in ('positive', 'negative')):
+            return np.nan
+    return json.dumps(sentiments)
+
+
+def clean_restaurant_chunk(chunk, stats):
+    """Normalize one chunk of merged_restaurant_data and collapse duplicate rows by branch key"""
+    chunk = chunk.copy()
+    chunk['name'] = normalize_names(chunk)
+
+    # Rows without a name or URL are padding left by the scrape join
+    empty = chunk['name'].isna() & chunk['url'].isna()
+    stats['empty_rows'] += int(empty.sum())
+    chunk = chunk[~empty]
+
+    if 'Menu' in chunk.columns:
+        menus = [validate_menu(menu) for menu in chunk['Menu']]
+        stats['invalid_menus'] += sum(1 for (menu, _), raw in zip(menus, chunk['Menu']) if pd.isna(menu) and pd.notna(raw))
+        stats['dropped_menu_items'] += sum(dropped for _, dropped in menus)
+        chunk['Menu'] = [menu for menu, _ in menus]
+    if 'Food Sentiments' in chunk.columns:
+        sentiments = chunk['Food Sentiments'].map(validate_sentiments)
+        stats['invalid_sentiments'] += int((sentiments.isna() & chunk['Food Sentiments'].notna()).sum())
+        chunk['Food Sentiments'] = sentiments
+
+    # A branch is its listing URL; rows without one fall back to name + address
+    fallback = ('name:' + chunk['name'].fillna('').str.lower() + '|'
+                + chunk['address'].astype(object).where(chunk['address'].notna(), '').astype(str).str.lower())
+    key = normalize_url(chunk['url'])
+    chunk.index = key.where(key != '', fallback).rename('_key')
+
+    chunk = chunk.drop(columns=[col for col in DROPPED_COLUMNS if col in chunk.columns])
+    return chunk.groupby(level=0, sort=False).first()
+
+
+def _first_per_key(parts):
+    """Merge cleaned chunks in one pass, keeping the first non-null value of each column per key"""
+    if not parts:
+        return None
+    return pd.concat(parts).groupby(level=0, sort=False).first()
+
+
+def clean_restaurants(path, chunk_size):
+    stats = {'rows': 0, 'empty_rows': 0, 'invalid_menus': 0, 'dropped_menu_items': 0, 'invalid_sentiments': 0}
+    parts = []
+    for chunk in pd.read_csv(path, encoding='latin1', chunksize=chunk_size, dtype=str):
+        stats['rows'] += len(chunk)
+        parts.append(clean_restaurant_chunk(chunk, stats))
+    merged = _first_per_key(parts)
+    stats['duplicate_rows'] = stats['rows'] - stats['empty_rows'] - (0 if merged is None else len(merged))
+    return merged, stats
+
+
+def clean_coordinates(path, chunk_size):
+    """res_id and coordinates per normalized listing URL"""
+    parts = []
+    for chunk in pd.read_csv(path, encoding='latin1', chunksize=chunk_size, dtype=str,
+                             usecols=['url'] + COORDINATE_COLUMNS):
+        chunk.index = normalize_url(chunk.pop('url')).rename('_key')
+        parts.append(chunk[chunk.index != ''].groupby(level=0, sort=False).first())
+    return _first_per_key(parts), {}
+
+
+def _cached_stage(name, func, path, digest, cache_dir, chunk_size, force):
+    """Run a cleaning stage, reusing the cached result while its input (hashed as `digest`) is unchanged"""
+    cache_path = os.path.join(cache_dir, f'{name}-v{PIPELINE_VERSION}-{digest}.pkl')
+    if not force and os.path.exists(cache_path):
+        logger.info(f"{name}: {os.path.basename(path)} unchanged, using cache")
+        frame, stats = pd.read_pickle(cache_path)
+    else:
+        started = time.perf_counter()
+        frame, stats = func(path, chunk_size)
+        os.makedirs(cache_dir, exist_ok=True)
+        pd.to_pickle((frame, stats), cache_path)
+        logger.info(f"{name}: processed {os.path.basename(path)} in {time.perf_counter() - started:.2f}s")
+    return frame, stats
+
+
+def content_hash(catalog):
+    """Hash of the catalog's columns and values, independent of the file format"""
+    return hashlib.sha256(catalog.to_csv(index=False).encode('utf-8')).hexdigest()
+
+
+def write_catalog(catalog, path, file_format):
+    tmp_path = path + '.tmp'
+    if file_format == 'parquet':
+        catalog.to_parquet(tmp_path, index=False)
+    else:
+        catalog.to_csv(tmp_path, index=False, encoding='latin1')
+    os.replace(tmp_path, path)
+
+
+def build(restaurants_path=DEFAULT_RESTAURANTS, coordinates_path=DEFAULT_COORDINATES, output_basename=CATALOG_BASENAME,
+          file_format=DEFAULT_FORMAT, cache_dir=DEFAULT_CACHE_DIR, chunk_size=10000, force=False):
+    """Build the serving catalog; returns its manifest"""
+    output_path = f'{output_basename}.{file_format}'
+    manifest_path = f'{output_basename}.manifest.json'
+
+    inputs = {name: {'path': os.path.abspath(path), 'sha256': file_sha256(path)}
+              for name, path in (('restaurants', restaurants_path), ('coordinates', coordinates_path))}
+    if not force and os.path.exists(output_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if (previous.get('inputs') == inputs and previous.get('pipeline_version') == PIPELINE_VERSION
+                and previous.get('file_sha256') == file_sha256(output_path)):
+            logger.info(f"{output_path} is up to date")
+            return previous
+
+    restaurants, stats = _cached_stage('restaurants', clean_restaurants, restaurants_path,
+                                       inputs['restaurants']['sha256'], cache_dir, chunk_size, force)
+    coordinates, _ = _cached_stage('coordinates', clean_coordinates, coordinates_path,
+                                   inputs['coordinates']['sha256'], cache_dir, chunk_size, force)
+
+    catalog = restaurants.join(coordinates, how='left')
+    stats['with_coordinates'] = int(catalog['latitude'].notna().sum())
+    stats['with_menu'] = int(catalog['Menu'].notna().sum()) if 'Menu' in catalog.columns else 0
+
+    # Restore numeric types that the string-typed streaming read left as text
+    catalog = catalog.reset_index(drop=True)
+    for column in catalog.columns:
+        if column not in ('Menu', 'Food Sentiments'):
+            numeric = pd.to_numeric(catalog[column], errors='coerce')
+            if numeric.notna().sum() == catalog[column].notna().sum():
+                catalog[column] = numeric
+    columns = ['name'] + [col for col in catalog.columns if col != 'name']
+    catalog = catalog[columns]
+
+    write_catalog(catalog, output_path, file_format)
+    manifest = {
+        'pipeline_version': PIPELINE_VERSION,
+        'format': file_format,
+        'path': os.path.abspath(output_path),
+        'rows': len(catalog),
+        'columns': list(catalog.columns),
+        'content_sha256': content_hash(catalog),
+        'file_sha256': file_sha256(output_path),
+        'inputs': inputs,
+        'stats': stats,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote {len(catalog)} restaurants to {output_path} (content {manifest['content_sha256'][:12]}); {stats}")
+    return manifest
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the serving catalog from the Dataset/ exports")
+    parser.add_argument('--restaurants', default=DEFAULT_RESTAURANTS, help="merged restaurant/menu/review export")
+    parser.add_argument('--coordinates', default=DEFAULT_COORDINATES, help="listing export with res_id and coordinates")
+    parser.add_argument('--output', default=CATALOG_BASENAME, help="output path without extension")
+    parser.add_argument('--format', choices=['parquet', 'csv'], default=DEFAULT_FORMAT,
+                        help="csv is read by older deployments")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--chunk-size', type=int, default=10000, help="rows read per chunk")
+    parser.add_argument('--force', action='store_true', help="ignore cached stages and rebuild everything")
+    args = parser.parse_args()
+    build(args.restaurants, args.coordinates, args.output, args.format, args.cache_dir, args.chunk_size, args.force)
+
+
+if __name__ == "__main__":
+    main()
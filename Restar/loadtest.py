@@ -0,0 +1,389 @@
+# loadtest.py
+#
+# End-to-end load generator for Restar.app: starts the API (or targets a
+# running one), replays a mix of realistic requests at increasing concurrency
+# and writes a JSON report that CI can diff across commits.
+#
+#   python -m Restar.loadtest --concurrency 1,2,4,8,16 --duration 15 --output report.json
+#   python -m Restar.loadtest --output new.json --compare baseline.json
+
+import argparse
+import ast
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+from Restar.catalog_builder import parse_menu_entries
+from Restar.etl import find_catalog, read_catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUTS = os.path.join(CURRENT_DIR, 'recommendation_inputs.csv')
+
+# Relative weight of each endpoint in the request mix
+DEFAULT_MIX = 'cafe-names=2,recommend=4,recommend-dishes=4,health=1'
+DISH_PATTERN = re.compile(r"Dish\(name='((?:[^'\\]|\\.)*)'\)")
+
+
+def _recommendation_body(restaurants, dishes):
+    body = {'restaurants': [{'name': name} for name in restaurants]}
+    if dishes:
+        body['favorite_dishes'] = [{'name': dish} for dish in dishes]
+    return json.dumps(body).encode()
+
+
+def selections_from_inputs(path):
+    """(restaurants, dishes) pairs logged in recommendation_inputs.csv"""
+    inputs = pd.read_csv(path)
+    selections = []
+    for restaurants, dishes in zip(inputs['selected_restaurants'], inputs['favorite_dishes']):
+        try:
+            names = ast.literal_eval(restaurants)
+        except (ValueError, SyntaxError):
+            continue
+        selections.append((list(names), DISH_PATTERN.findall(str(dishes))))
+    return selections
+
+
+def resolvable_selections(selections, cafe_names):
+    """Keep the selections whose restaurants all resolve against the served cafe names.
+
+    Mirrors DualRecommender.find_restaurant (best fuzzy ratio above 60), so
+    replayed requests exercise the recommender instead of ending in a 404.
+    """
+    resolved = {}
+
+    def resolves(name):
+        key = name.lower().strip()
+        if key not in resolved:
+            resolved[key] = any(fuzz.ratio(key, str(cafe)) > 60 for cafe in cafe_names)
+        return resolved[key]
+
+    return [(restaurants, dishes) for restaurants, dishes in selections
+            if all(resolves(name) for name in restaurants)]
+
+
+def selections_from_catalog(cafe_names, csv_path, rng, count=500, max_restaurants=3, max_dishes=3):
+    """Random selections drawn from the served cafe names and the catalog's menus"""
+    menus = read_catalog(csv_path)['Menu']
+    dishes = sorted({item for menu in menus.dropna() for item, _, _ in parse_menu_entries(menu)})
+    selections = []
+    for _ in range(count):
+        restaurants = rng.sample(cafe_names, rng.randint(1, min(max_restaurants, len(cafe_names))))
+        favorites = rng.sample(dishes, rng.randint(1, min(max_dishes, len(dishes)))) if dishes else []
+        selections.append((restaurants, favorites))
+    return selections
+
+
+def build_request_pools(selections):
+    """Requests per endpoint label as (method, path, body) tuples"""
+    return {
+        'cafe-names': [('GET', '/cafe-names/', None)],
+        'health': [('GET', '/health', None)],
+        'recommend': [('POST', '/recommendations/', _recommendation_body(restaurants, []))
+                      for restaurants, _ in selections if restaurants],
+        'recommend-dishes': [('POST', '/recommendations/', _recommendation_body(restaurants, dishes))
+                             for restaurants, dishes in selections if restaurants and dishes],
+    }
+
+
+def parse_mix(spec):
+    weights = {}
+    for part in spec.split(','):
+        label, _, weight = part.partition('=')
+        weights[label.strip()] = float(weight or 1)
+    return weights
+
+
+def _request(connection, method, path, body):
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def _worker(host, port, pools, labels, weights, deadline, seed, samples):
+    """Closed-loop client: send the next request as soon as the previous one completes"""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    while time.perf_counter() < deadline:
+        label = rng.choices(labels, weights)[0]
+        method, path, body = rng.choice(pools[label])
+        started = time.perf_counter()
+        try:
+            status = _request(connection, method, path, body)
+        except (OSError, http.client.HTTPException):
+            status = None
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+        samples.append((label, time.perf_counter() - started, status))
+    connection.close()
+
+
+def _latency_summary(latencies):
+    if not len(latencies):
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'max_ms': None}
+    millis = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(millis, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+            'mean_ms': round(float(millis.mean()), 3), 'max_ms': round(float(millis.max()), 3)}
+
+
+def _summarize(samples, elapsed):
+    """RPS, latency percentiles and error rates for one batch of samples"""
+    statuses = Counter('error' if status is None else str(status) for _, _, status in samples)
+    total = len(samples)
+    server_errors = sum(count for status, count in statuses.items() if status == 'error' or status.startswith('5'))
+    client_errors = sum(count for status, count in statuses.items() if status.startswith('4'))
+    return {
+        'requests': total,
+        'rps': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency': _latency_summary([latency for _, latency, _ in samples]),
+        # Transport failures and 5xx; 4xx (e.g. unknown restaurant names) are reported separately
+        'error_rate': round(server_errors / total, 4) if total else 0.0,
+        'client_error_rate': round(client_errors / total, 4) if total else 0.0,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+def run_level(host, port, pools, weights, concurrency, duration, seed=0):
+    labels = [label for label in weights if weights[label] > 0 and pools.get(label)]
+    label_weights = [weights[label] for label in labels]
+    samples = []  # list.append is atomic, so workers share it without a lock
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    workers = [
+        threading.Thread(target=_worker,
+                         args=(host, port, pools, labels, label_weights, deadline, seed * 1000 + i, samples))
+        for i in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample[0]].append(sample)
+    level = {'concurrency': concurrency, 'duration_s': round(elapsed, 3)}
+    level.update(_summarize(samples, elapsed))
+    level['endpoints'] = {label: _summarize(by_label[label], elapsed) for label in sorted(by_label)}
+    return level
+
+
+def saturation(levels):
+    """Peak throughput and the lowest concurrency that reaches 90% of it"""
+    if not levels:
+        return {}
+    peak = max(levels, key=lambda level: level['rps'])
+    knee = next(level for level in levels if level['rps'] >= 0.9 * peak['rps'])
+    return {'peak_rps': peak['rps'], 'peak_concurrency': peak['concurrency'],
+            'knee_concurrency': knee['concurrency'],
+            'curve': [[level['concurrency'], level['rps'], level['latency']['p99_ms']] for level in levels]}
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of `report` against `baseline` at the concurrency levels both ran"""
+    regressions = []
+    baseline_levels = {level['concurrency']: level for level in baseline.get('levels', [])}
+    for level in report['levels']:
+        base = baseline_levels.get(level['concurrency'])
+        if base is None:
+            continue
+        prefix = f"concurrency {level['concurrency']}"
+        if level['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{prefix}: rps {level['rps']} < baseline {base['rps']}")
+        for percentile in ('p95_ms', 'p99_ms'):
+            current, previous = level['latency'][percentile], base['latency'][percentile]
+            if current is not None and previous is not None and current > previous * (1 + tolerance):
+                regressions.append(f"{prefix}: {percentile} {current} > baseline {previous}")
+        if level['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{prefix}: error_rate {level['error_rate']} > baseline {base['error_rate']}")
+    return regressions
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            if _request(connection, 'GET', '/health', None) == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API on {host}:{port} did not become healthy within {timeout}s")
+
+
+def start_server(port, workers=1, in_process=False, log_path=None):
+    """Start Restar.app on localhost; returns a function that stops it"""
+    if in_process:
+        # Shares the GIL with the load generator, so numbers are pessimistic
+        import uvicorn
+        server = uvicorn.Server(uvicorn.Config('Restar.app:app', host='127.0.0.1', port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+
+        def stop():
+            server.should_exit = True
+            thread.join()
+        return stop
+
+    if workers > 1:
+        command = [sys.executable, '-m', 'Restar.serve', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--report-interval', '0']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'Restar.app:app', '--host', '127.0.0.1', '--port', str(port)]
+    log = open(log_path, 'ab') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                               cwd=os.path.dirname(CURRENT_DIR))
+
+    def stop():
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if log is not subprocess.DEVNULL:
+            log.close()
+    return stop
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=CURRENT_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the recommender API and report latency/throughput")
+    parser.add_argument('--url', help="test an already running API instead of starting one")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers when starting the API")
+    parser.add_argument('--in-process', action='store_true', help="run the API in this process instead of a subprocess")
+    parser.add_argument('--server-log', help="file that receives the started API's output")
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--source', choices=['inputs', 'catalog'], default='inputs',
+                        help="replay recommendation_inputs.csv or generate selections from the catalog")
+    parser.add_argument('--inputs', default=DEFAULT_INPUTS)
+    parser.add_argument('--csv', default=find_catalog(), help="catalog whose menus supply dishes for --source catalog")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="relative endpoint weights, e.g. recommend=4,health=1")
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help="comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=2, help="seconds of unrecorded load before the first level")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--compare', help="baseline report; exit non-zero on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="allowed relative drop in rps / rise in p95 and p99 against --compare")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+
+    stop = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = '127.0.0.1', _free_port()
+        logger.info(f"Starting the API on port {port}...")
+        stop = start_server(port, args.workers, args.in_process, args.server_log)
+
+    try:
+        wait_until_healthy(host, port, args.startup_timeout)
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        connection.request('GET', '/cafe-names/')
+        cafe_names = json.loads(connection.getresponse().read())
+        connection.close()
+        source = args.source
+        if source == 'inputs':
+            logged = selections_from_inputs(args.inputs)
+            selections = resolvable_selections(logged, cafe_names)
+            logger.info(f"Dropped {len(logged) - len(selections)} of {len(logged)} logged selections "
+                        f"naming restaurants the API does not know")
+            if not selections:
+                logger.warning("No logged selection resolves against /cafe-names/; using --source catalog")
+                source = 'catalog'
+        if source == 'catalog':
+            selections = selections_from_catalog(cafe_names, args.csv, rng)
+        pools = build_request_pools(selections)
+        logger.info(f"Request pools: { {label: len(pool) for label, pool in pools.items()} }")
+
+        if args.warmup > 0:
+            run_level(host, port, pools, weights, max(levels), args.warmup, seed=args.seed)
+
+        results = []
+        for concurrency in levels:
+            level = run_level(host, port, pools, weights, concurrency, args.duration, seed=args.seed)
+            logger.info(f"concurrency={concurrency} rps={level['rps']} p50={level['latency']['p50_ms']}ms "
+                        f"p99={level['latency']['p99_ms']}ms errors={level['error_rate']:.2%}")
+            results.append(level)
+    finally:
+        if stop is not None:
+            stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'target': args.url or f"{'in-process' if args.in_process else 'subprocess'} x{args.workers}",
+            'source': source,
+            'selections': len(selections),
+            'mix': weights,
+            'duration_s': args.duration,
+            'seed': args.seed,
+        },
+        'levels': results,
+        'saturation': saturation(results),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,88 @@
 from flask import Flask, render_template, request
+import logging
+import os
 import pickle
+import numpy as np
 import pandas as pd  # Import pandas to handle CSV files
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
-# Load the recommendation model
-with open("popup_recommender.pkl", "rb") as file:
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Paths can be overridden through the environment
+MODEL_PATH = os.environ.get("POPUP_MODEL_PATH", os.path.join(current_dir, "popup_recommender.pkl"))
+CSV_FILE_PATH = os.environ.get("POPUP_DATA_PATH", os.path.join(current_dir, "hogaya_dataset.csv"))
+
+# Dataset columns compared against the form's max_price / max_item_price
+PRICE_COLUMN = os.environ.get("POPUP_PRICE_COLUMN", "price")
+ITEM_PRICE_COLUMN = os.environ.get("POPUP_ITEM_PRICE_COLUMN", "item_price")
+
+
+class PopupIndex:
+    """In-memory view of the popup dataset, indexed once so requests only do lookups"""
+
+    def __init__(self, df):
+        self.records = df.to_dict(orient="records")
+        self.food_items = self._hash_index(df, "food_item")
+        self.areas = self._hash_index(df, "area")
+        self.price_ranks = {
+            column: self._price_rank(df[column]) for column in (PRICE_COLUMN, ITEM_PRICE_COLUMN)
+            if column in df.columns
+        }
+        for column in (PRICE_COLUMN, ITEM_PRICE_COLUMN):
+            if column not in df.columns:
+                logger.warning(f"Price column '{column}' not in the popup dataset; its limit will be ignored. "
+                               f"Set POPUP_PRICE_COLUMN / POPUP_ITEM_PRICE_COLUMN to the dataset's column names.")
+
+    @staticmethod
+    def _hash_index(df, column):
+        """Map each value of `column` to the sorted row positions holding it"""
+        if column not in df.columns:
+            return None
+        return {value: np.asarray(rows) for value, rows in df.groupby(column, sort=False).indices.items()}
+
+    @staticmethod
+    def _price_rank(prices):
+        """Sorted prices plus each row's position in that order.
+
+        A row is within a budget when its rank is below the budget's insertion
+        point, so one binary search answers the filter for every candidate.
+        """
+        prices = pd.to_numeric(prices, errors="coerce").to_numpy(dtype=np.float64)
+        order = np.argsort(prices, kind="stable")  # NaN prices sort last and never pass
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        return prices[order], rank
+
+    def _within(self, rows, column, limit):
+        if limit is None or column not in self.price_ranks:
+            return rows
+        sorted_prices, rank = self.price_ranks[column]
+        cutoff = np.searchsorted(sorted_prices, limit, side="right")
+        return rows[rank[rows] < cutoff]
+
+    def lookup(self, food_items, area=None, max_price=None, max_item_price=None):
+        """Rows whose food_item is in `food_items`, narrowed by area and price limits"""
+        if self.food_items is None:
+            return []
+        matches = [self.food_items[item] for item in food_items if item in self.food_items]
+        if not matches:
+            return []
+        rows = np.unique(np.concatenate(matches))  # dataset order, like an isin filter
+
+        if area and self.areas is not None:
+            rows = np.intersect1d(rows, self.areas.get(area, np.array([], dtype=rows.dtype)))
+        rows = self._within(rows, PRICE_COLUMN, max_price)
+        rows = self._within(rows, ITEM_PRICE_COLUMN, max_item_price)
+        return [self.records[row] for row in rows]
+
+
+# Load the recommendation model and the dataset once at startup
+with open(MODEL_PATH, "rb") as file:
     model = pickle.load(file,encoding="latin1")
 
-# Load the CSV data
-CSV_FILE_PATH = r"C:/Users/fortune/Downloads/Restar/Restar/hogaya_dataset.csv"  # Update this with the actual CSV file path
+index = PopupIndex(pd.read_csv(CSV_FILE_PATH, encoding="latin1"))
 
 @app.route("/")
 def home():
@@ -36,17 +109,13 @@ def recommend():
         "food_item": food_item,
         "max_item_price": max_item_price
     }
-    
-    recommendations = model.predict(user_input) if hasattr(model, "predict") else []
 
-    # Load the CSV file and filter based on recommendations
-    df = pd.read_csv(CSV_FILE_PATH,encoding="latin1")
-
-    # Example: If recommendations are food items, filter rows where 'food_item' matches
-    filtered_recommendations = df[df["food_item"].isin(recommendations)]  
+    recommendations = model.predict(user_input) if hasattr(model, "predict") else []
 
-    # Convert to dictionary for rendering in HTML
-    recommendations_list = filtered_recommendations.to_dict(orient="records")
+    # Example: If recommendations are food items, look up the rows whose 'food_item' matches
+    recommendations_list = index.lookup(
+        recommendations, area=area, max_price=max_price, max_item_price=max_item_price
+    )
 
     return render_template("results.html", recommendations=recommendations_list, area=area)
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class Restaurant(BaseModel):
@@ -10,6 +10,8 @@ class Dish(BaseModel):
 class RecommendationRequest(BaseModel):
     restaurants: List[Restaurant]
     favorite_dishes: Optional[List[Dish]] = None
+    limit: int = Field(20, ge=1, le=100)  # similar dishes per page
+    cursor: Optional[str] = None
 
 class SimilarDish(BaseModel):
     restaurant: str
@@ -20,8 +22,22 @@ class SimilarDish(BaseModel):
     similarity: float
     rating: Optional[float]
     address: str
+    dish_id: Optional[int] = None  # canonical dish the match belongs to
+    typical_price: Optional[float] = None  # median price of that dish across restaurants
 
 class RecommendationResponse(BaseModel):
     recommended_restaurants: List[dict]
     similar_dishes: Optional[List[SimilarDish]] = None
-    recommendation_id: str
\ No newline at end of file
+    next_cursor: Optional[str] = None
+    recommendation_id: str
+
+class SimilarDishesPage(BaseModel):
+    recommendation_id: str
+    similar_dishes: List[SimilarDish]
+    next_cursor: Optional[str] = None
+
+class SessionResponse(BaseModel):
+    session_id: str
+    restaurants: List[str]
+    favorite_dishes: List[str]
+    recommended_restaurants: List[dict]
@@ -4,103 +4,112 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from fuzzywuzzy import fuzz
-import re
-import ast
+import heapq
+import logging
+import sys
+import time
+
+from Restar.catalog_builder import build_catalog
+from Restar.dishes import build_dish_index, normalize_dish, ratio_upper_bounds
+from Restar.strings import StringTable
+
+logger = logging.getLogger(__name__)
+
+# Columns kept on the compact frame; Menu and Food Sentiments are parsed into arrays and released
+KEPT_COLUMNS = ['name', 'address', 'cuisines', 'establishment', 'highlights', 'aggregate_rating']
+
+# Production blend: positive ratio / normalized votes / review volume, and feature / menu similarity
+QUALITY_WEIGHTS = (0.4, 0.3, 0.3)
+BLEND_WEIGHTS = (0.7, 0.3)
+
+# Repeated strings are stored once per distinct value
+CATEGORICAL_COLUMNS = ['name', 'cleaned_name', 'base_name', 'cuisines', 'establishment', 'highlights']
 
 class DualRecommender:
-    def __init__(self, df, min_votes=50):
+    def __init__(self, df, min_votes=50, n_jobs=1, chunk_size=500):
         self.df = df
         self.min_votes = min_votes
-        self._prepare_data()
-        self._initialize_models()
-
-    def _prepare_data(self):
+        self.build_timings = {}
+        started = time.perf_counter()
+        catalog = build_catalog(df, n_jobs=n_jobs, chunk_size=chunk_size, timings=self.build_timings)
+        self._prepare_data(catalog, n_jobs=n_jobs)
+        self._initialize_models(catalog)
+        self.build_timings['total'] = time.perf_counter() - started
+        logger.info("Recommender built: " + ", ".join(
+            f"{stage}={seconds:.2f}s" for stage, seconds in self.build_timings.items()))
+
+    def _prepare_data(self, catalog, n_jobs=1):
         """Prepare and clean the dataset"""
+        started = time.perf_counter()
+        source = self.df
+        self.df = source[[col for col in KEPT_COLUMNS if col in source.columns]].reset_index(drop=True)
+
         # Basic cleaning
-        self.df['votes'] = pd.to_numeric(self.df['votes'], errors='coerce')
-        self.df['cleaned_name'] = self.df['name'].astype(str)
-        self.df['cleaned_name'] = self.df['cleaned_name'].replace("","\\")
+        self.df['votes'] = pd.to_numeric(source['votes'], errors='coerce').to_numpy(dtype=np.float64)
+        self.df['cleaned_name'] = catalog['cleaned_name']
+
+        # Base restaurant names (location identifiers removed)
+        self.df['base_name'] = catalog['base_name']
+
+        # Food sentiments as typed columns instead of a dict per row
+        self.df['positive_ratio'] = catalog['positive_ratio']
+        self.df['total_reviews'] = catalog['total_reviews']
+
+        # Average price from the parsed menus
+        self.df['avg_price'] = catalog['avg_price']
+
+        # Menus as flat arrays: items of row i live at menu_offsets[i]:menu_offsets[i + 1]
+        self.menu_offsets = catalog['menu_offsets']
+        self.menu_item_ids = catalog['menu_item_ids']
+        self.menu_prices = catalog['menu_prices']
+        self.menu_veg_codes = catalog['menu_veg_codes']
+        # Item and veg-status names as packed UTF-8 tables instead of one str object each
+        self.menu_items = StringTable.from_strings(catalog['menu_items'])
+        self.veg_statuses = StringTable.from_strings(catalog['veg_statuses'])
+
+        # Spellings of a dish share one canonical id, named after its leading item;
+        # the flat menu positions of dish d are dish_postings[dish_offsets[d]:dish_offsets[d + 1]]
+        dishes_started = time.perf_counter()
+        dishes = build_dish_index(catalog['menu_items'], self.menu_item_ids, self.menu_prices, n_jobs=n_jobs)
+        self.dish_leaders = dishes['dish_leaders']
+        self.dish_keys = dishes['dish_keys']
+        self.spelling_keys = dishes['spelling_keys']
+        self.spelling_dish_ids = dishes['spelling_dish_ids']
+        self.item_dish_ids = dishes['item_dish_ids']
+        self.dish_offsets = dishes['dish_offsets']
+        self.dish_postings = dishes['dish_postings']
+        self.dish_price_min = dishes['dish_price_min']
+        self.dish_price_median = dishes['dish_price_median']
+        self.dish_price_max = dishes['dish_price_max']
+        self.build_timings['dishes'] = time.perf_counter() - dishes_started
 
-        # Extract base restaurant names (removing location identifiers)
-        self.df['base_name'] = self.df['cleaned_name'].apply(self._extract_base_name)
+        # Normalize numerical features
+        self._normalize_features()
 
-        # Process food sentiments
-        self.df['sentiment_scores'] = self.df['Food Sentiments'].apply(self._process_food_sentiments)
+        # Quality part of the score is request independent
+        self.quality_scores = self.compute_quality_scores(QUALITY_WEIGHTS)
 
-        # Get average price from menu
-        self.df['avg_price'] = self.df['Menu'].apply(self._get_avg_price)
+        for column in CATEGORICAL_COLUMNS:
+            if column in self.df.columns:
+                self.df[column] = self.df[column].astype('category')
+        self.base_name_codes = self.df['base_name'].cat.codes.to_numpy()
+        self.build_timings['prepare'] = time.perf_counter() - started
+
+    def compute_quality_scores(self, weights):
+        """Blend positive ratio, normalized votes and review volume with `weights`"""
+        return (
+            weights[0] * self.df['positive_ratio'].to_numpy() +
+            weights[1] * self.df['normalized_votes'].to_numpy() +
+            weights[2] * np.minimum(self.df['total_reviews'].to_numpy() / 100, 1)
+        )
 
-        # Normalize numerical features
-        self._normalize_features()
     def get_cafe_names(self):
         """Return a list of cafe names from the dataset."""
         return self.df['cleaned_name'].tolist()
-    def _extract_base_name(self, name):
-        """Extract base restaurant name by removing location identifiers"""
-        # Common location identifiers and branch indicators
-        location_indicators = [
-            r'\b(branch)\b', r'\b(outlet)\b', r'-.*$', r'\(.*\)',
-            r',.*$', r'\d+(?:st|nd|rd|th).*$'
-        ]
-
-        base_name = name
-        for indicator in location_indicators:
-            base_name = re.sub(indicator, '', base_name, flags=re.IGNORECASE)
-
-        return base_name.strip()
-
-    def _process_food_sentiments(self, sentiments_str):
-        """Process food sentiments from string format"""
-        try:
-            if pd.isna(sentiments_str):
-                return {'positive_ratio': 0, 'total_reviews': 0}
-
-            # Convert string to dictionary
-            sentiments_dict = ast.literal_eval(sentiments_str)
-
-            # Calculate total positive and negative reviews
-            total_positive = sum(item.get('positive', 0) for item in sentiments_dict.values())
-            total_negative = sum(item.get('negative', 0) for item in sentiments_dict.values())
-            total = total_positive + total_negative
-
-            return {
-                'positive_ratio': total_positive / total if total > 0 else 0,
-                'total_reviews': total
-            }
-        except:
-            return {'positive_ratio': 0, 'total_reviews': 0}
-
-    def _process_menu(self, menu_str):
-        """Process menu string into a list of items with their details"""
-        try:
-            if pd.isna(menu_str):
-                return []
-
-            # Convert string to dictionary
-            menu_dict = ast.literal_eval(menu_str)
-
-            # Extract menu items and their details
-            menu_items = []
-            for item, details in menu_dict.items():
-                # Handle the format {"item": ["veg/non-veg", price]}
-                veg_status, price = details
-                menu_items.append({
-                    'item': item.lower(),
-                    'veg_status': veg_status,
-                    'price': float(price)
-                })
-            return menu_items
-        except:
-            return []
 
-    def _get_avg_price(self, menu_str):
-        """Calculate average price from menu items"""
-        try:
-            menu_items = self._process_menu(menu_str)
-            prices = [item['price'] for item in menu_items if item['price'] > 0]
-            return np.mean(prices) if prices else 0
-        except:
-            return 0
+    def _menu_rows(self, positions):
+        """Map positions in the flat menu arrays back to restaurant rows"""
+        return np.searchsorted(self.menu_offsets, positions, side='right') - 1
 
     def _normalize_features(self):
         """Normalize numerical features"""
@@ -111,45 +120,24 @@ class DualRecommender:
                     (self.df[column].max() - self.df[column].min())
                 ).fillna(0)
 
-    def _initialize_models(self):
+    def _initialize_models(self, catalog):
         """Initialize both recommendation models"""
         # Feature-based model initialization
+        started = time.perf_counter()
         self.feature_vectorizer = TfidfVectorizer(stop_words='english')
-        self.df['combined_features'] = self.df.apply(self._combine_features, axis=1)
-        self.feature_matrix = self.feature_vectorizer.fit_transform(self.df['combined_features'])
+        self.feature_matrix = self.feature_vectorizer.fit_transform(catalog['combined_features'])
+        self.build_timings['feature_tfidf'] = time.perf_counter() - started
 
         # Menu-based model initialization
+        started = time.perf_counter()
         self.menu_vectorizer = TfidfVectorizer(stop_words='english')
-        self.df['menu_text'] = self.df['Menu'].apply(
-            lambda x: ' '.join([item['item'] for item in self._process_menu(x)])
-        )
-        self.menu_matrix = self.menu_vectorizer.fit_transform(self.df['menu_text'])
-
-    def _combine_features(self, row):
-        """Combine restaurant features into a single string"""
-        features = []
-
-        # Add core features
-        if pd.notna(row['cuisines']):
-            features.append(str(row['cuisines']))
-
-        if pd.notna(row['address']):
-            features.append(str(row['address']))
-
-        if pd.notna(row['establishment']):
-            features.append(str(row['establishment']))
+        self.menu_matrix = self.menu_vectorizer.fit_transform(catalog['menu_text'])
+        self.build_timings['menu_tfidf'] = time.perf_counter() - started
 
-        if pd.notna(row['highlights']):
-            features.append(str(row['highlights']))
-
-        # Add price range indicator based on average price
-        if row['avg_price'] > 0:
-            price_level = "budget" if row['avg_price'] < 300 else \
-                         "mid_range" if row['avg_price'] < 600 else "expensive"
-            features.append(price_level)
-
-        combined = ' '.join(features).lower()
-        return re.sub(r'[^a-zA-Z0-9\s]', ' ', combined)
+        # Term-major copies (row t = weight of term t in every restaurant) for
+        # incremental session updates; published as shared segments like the rest
+        self.feature_terms = self.feature_matrix.T.tocsr()
+        self.menu_terms = self.menu_matrix.T.tocsr()
 
     def find_restaurant(self, name):
         """Find restaurant using fuzzy matching"""
@@ -159,40 +147,6 @@ class DualRecommender:
         best_match = max(similarities, key=lambda x: x[1])
         return best_match[0] if best_match[1] > 60 else None
 
-    def find_similar_menu_items(self, favorite_dishes):
-        """Find similar menu items across all restaurants"""
-        similar_items = []
-
-        for dish in favorite_dishes:
-            dish_lower = dish.lower()
-            for idx, row in self.df.iterrows():
-                menu_items = self._process_menu(row['Menu'])
-                for menu_item in menu_items:
-                    item_name = menu_item['item']
-                    similarity = fuzz.ratio(dish_lower, item_name)
-                    if similarity > 70:  # Threshold for similarity
-                        similar_items.append({
-                            'restaurant': row['name'],
-                            'original_dish': dish,
-                            'similar_dish': item_name,
-                            'price': menu_item['price'],
-                            'veg_status': menu_item['veg_status'],
-                            'similarity': similarity
-                        })
-
-        # Sort by similarity and remove duplicates
-        similar_items.sort(key=lambda x: x['similarity'], reverse=True)
-
-        # Remove duplicate dishes from same restaurant
-        unique_items = []
-        seen = set()
-        for item in similar_items:
-            key = (item['restaurant'], item['similar_dish'])
-            if key not in seen:
-                unique_items.append(item)
-                seen.add(key)
-
-        return unique_items
     def display_menu_recommendations(self, similar_items):
       """Display menu recommendations in a formatted way"""
       if not similar_items:
@@ -213,117 +167,135 @@ class DualRecommender:
           print(f"📊 Similarity to '{item['original_dish']}': {item['similarity']}%")
           print("-" * 40)
 
+    def feature_similarities(self, selected_indices):
+        """Cosine similarity of every restaurant with the mean of the selected ones"""
+        if not selected_indices:
+            return np.zeros(self.feature_matrix.shape[0])
+        average_vector = self.feature_matrix[selected_indices].mean(axis=0).A
+        return cosine_similarity(self.feature_matrix, average_vector).flatten()
+
+    def menu_similarities(self, favorite_dishes):
+        """Cosine similarity of every menu with the joined favorite dishes"""
+        query_vector = self.menu_vectorizer.transform([' '.join(favorite_dishes)])
+        return cosine_similarity(self.menu_matrix, query_vector).flatten()
+
     def feature_based_recommendations(self, selected_indices, n_recommendations=20):
         """Generate recommendations based on restaurant features"""
         if not selected_indices:
             return []
 
-        # Calculate feature similarity
-        selected_vectors = self.feature_matrix[selected_indices]
-        average_vector = selected_vectors.mean(axis=0)
-
-        average_vector = average_vector.A
-        feature_similarities = cosine_similarity(self.feature_matrix, average_vector)
-        # Calculate quality score
-        quality_scores = (
-            0.4 * self.df['sentiment_scores'].apply(lambda x: x['positive_ratio']) +
-            0.3 * self.df['normalized_votes'] +
-            0.3 * self.df['sentiment_scores'].apply(lambda x: min(x['total_reviews'] / 100, 1))
-        )
-
         # Combine similarity with quality score
-        feature_scores = feature_similarities.flatten() * quality_scores
+        feature_scores = self.feature_similarities(selected_indices) * self.quality_scores
 
         return self._get_top_recommendations(feature_scores, selected_indices, n_recommendations)
 
-    def find_similar_menu_items(self, favorite_dishes):
-      """Find similar menu items across all restaurants"""
-      similar_items = []
+    def find_similar_menu_items(self, favorite_dishes, limit=None, offset=0):
+      """Find similar menu items across all restaurants.
+
+      Each favorite dish is fuzzy-matched against the canonical dishes once;
+      dishes whose character counts rule out a match are skipped, and a
+      dish the favorite is a known spelling of scores 100 without a fuzzy
+      comparison. The matching dishes' postings are read directly. Matches
+      are ranked by similarity, then price, and de-duplicated per
+      (restaurant, canonical dish), so spelling variants on one menu show up
+      once. With `limit`, only
+      the best ``offset + limit`` matches are kept in a bounded heap and the
+      page ``[offset:offset + limit]`` is returned.
+      """
+      k = offset + limit if limit is not None else float('inf')
+      heap = []  # (rank, key, match) min-heap, worst kept match on top
+      best = {}  # key -> rank of its live heap entry; older entries of a key are stale
+      name_codes = self.df['name'].cat.codes.to_numpy()
+      sequence = 0
 
       for dish in favorite_dishes:
-          dish_lower = dish.lower()
-          for idx, row in self.df.iterrows():
-              try:
-                  menu_dict = ast.literal_eval(row['Menu']) if isinstance(row['Menu'], str) else row['Menu']
-                  for item_name, (veg_status, price) in menu_dict.items():
-                      similarity = fuzz.ratio(dish_lower, item_name.lower())
-                      if similarity > 70:  # Threshold for similarity
-                          similar_items.append({
-                              'restaurant': row['name'],
-                              'original_dish': dish,
-                              'similar_dish': item_name,
-                              'price': float(price),
-                              'veg_status': veg_status,
-                              'similarity': similarity,
-                              'rating': row['aggregate_rating'] if 'aggregate_rating' in row else None,
-                              'address': row['address']
-                          })
-              except:
-                  continue
-
-      # Sort by similarity and remove duplicates
-      similar_items.sort(key=lambda x: (-x['similarity'], -x['price']))
-
-      # Remove duplicate dishes from same restaurant
-      unique_items = []
-      seen = set()
-      for item in similar_items:
-          key = (item['restaurant'], item['similar_dish'])
-          if key not in seen:
-              unique_items.append(item)
-              seen.add(key)
-
-      return unique_items
+          query = normalize_dish(dish) or dish.lower()
+          spelling = self.spelling_keys.position(query)
+          exact = None if spelling is None else self.spelling_dish_ids[spelling]
+          # A ratio above 70 rounds from at least 70.5, so no match is dropped here
+          candidates = np.flatnonzero(
+              ratio_upper_bounds(query, self.dish_keys) >= 70.5)
+          matches = []
+          for dish_id in candidates:
+              similarity = 100 if dish_id == exact else fuzz.ratio(query, self.dish_keys[dish_id])
+              if similarity > 70:  # Threshold for similarity
+                  matches.append((dish_id, similarity))
+          for dish_id, similarity in matches:
+              positions = self.dish_postings[self.dish_offsets[dish_id]:self.dish_offsets[dish_id + 1]]
+              for position, row, price in zip(positions, self._menu_rows(positions), self.menu_prices[positions]):
+                  sequence += 1
+                  # Earlier matches win ties, as with a stable sort
+                  rank = (similarity, float(price), -sequence)
+                  key = (name_codes[row], dish_id)
+
+                  current = best.get(key)
+                  if current is not None and current >= rank:
+                      continue
+                  if current is None and len(best) >= k:
+                      if rank <= heap[0][0]:
+                          continue
+                      _, evicted, _ = heapq.heappop(heap)
+                      del best[evicted]
+                  best[key] = rank
+                  heapq.heappush(heap, (rank, key, (dish, position, row)))
+
+                  # Keep a live entry on top so heap[0] is the current cut-off
+                  while heap and best.get(heap[0][1]) != heap[0][0]:
+                      heapq.heappop(heap)
+
+      ranked = sorted((entry for entry in heap if best.get(entry[1]) == entry[0]), reverse=True)
+      page = ranked[offset:k] if limit is not None else ranked[offset:]
+
+      has_rating = 'aggregate_rating' in self.df.columns
+      similar_items = []
+      for rank, (_, dish_id), (dish, position, row) in page:
+          restaurant = self.df.iloc[row]
+          median_price = self.dish_price_median[dish_id]
+          similar_items.append({
+              'restaurant': restaurant['name'],
+              'original_dish': dish,
+              'similar_dish': self.menu_items[self.menu_item_ids[position]],
+              'price': rank[1],
+              'veg_status': self.veg_statuses[self.menu_veg_codes[position]],
+              'similarity': rank[0],
+              'rating': restaurant['aggregate_rating'] if has_rating else None,
+              'address': restaurant['address'],
+              'dish_id': int(dish_id),
+              'typical_price': None if np.isnan(median_price) else float(median_price)
+          })
+      return similar_items
     def menu_based_recommendations(self, favorite_dishes, n_recommendations=10):
         """Generate recommendations based on menu similarity"""
         if not favorite_dishes:
             return []
 
-        # Create a query vector from favorite dishes
-        query_vector = self.menu_vectorizer.transform([' '.join(favorite_dishes)])
-
-        # Calculate menu similarity
-        menu_similarities = cosine_similarity(self.menu_matrix, query_vector)
-
-        # Calculate quality score
-        quality_scores = (
-            0.4 * self.df['sentiment_scores'].apply(lambda x: x['positive_ratio']) +
-            0.3 * self.df['normalized_votes'] +
-            0.3 * self.df['sentiment_scores'].apply(lambda x: min(x['total_reviews'] / 100, 1))
-        )
-
         # Combine similarity with quality score
-        menu_scores = menu_similarities.flatten() * quality_scores
+        menu_scores = self.menu_similarities(favorite_dishes) * self.quality_scores
 
         return self._get_top_recommendations(menu_scores, [], n_recommendations) # Excluding selected indices as it's menu based
 
-    def _get_top_recommendations(self, scores, excluded_indices, n):
+    def _get_top_recommendations(self, scores, excluded_indices, n, min_votes=None):
         """Get top recommendations excluding certain indices and same-brand restaurants"""
-        # Apply minimum votes filter
-        mask = (self.df['votes'] >= self.min_votes)
-
-        # Get base names of excluded restaurants
-        excluded_base_names = set()
-        for idx in excluded_indices:
-            excluded_base_names.add(self.df.iloc[idx]['base_name'])
+        excluded_indices = list(excluded_indices)
 
-        # Create scored indices excluding selected restaurants and their branches
-        scored_indices = []
-        seen_base_names = set()
+        # Apply minimum votes filter
+        mask = self.df['votes'].to_numpy() >= (self.min_votes if min_votes is None else min_votes)
+        mask[excluded_indices] = False
 
-        for i in range(len(self.df)):
-            if (i not in excluded_indices and
-                mask[i] and
-                self.df.iloc[i]['base_name'] not in excluded_base_names and
-                self.df.iloc[i]['base_name'] not in seen_base_names):
+        # Drop branches of excluded restaurants
+        mask &= ~np.isin(self.base_name_codes, self.base_name_codes[excluded_indices])
 
-                scored_indices.append((i, scores[i]))
-                seen_base_names.add(self.df.iloc[i]['base_name'])
+        # Keep only the first eligible restaurant of every brand
+        candidates = np.flatnonzero(mask)
+        _, first = np.unique(self.base_name_codes[candidates], return_index=True)
+        candidates = np.sort(candidates[first])
 
         # Sort and return top recommendations
-        return sorted(scored_indices, key=lambda x: x[1], reverse=True)[:n]
+        scores = np.asarray(scores)
+        order = np.argsort(-scores[candidates], kind='stable')[:n]
+        return [(int(i), scores[i]) for i in candidates[order]]
 
-    def combine_recommendations(self, feature_recs, menu_recs, weights=(0.7, 0.3)):
+    def combine_recommendations(self, feature_recs, menu_recs, weights=BLEND_WEIGHTS):
         """Combine recommendations from both models"""
         feature_scores = {idx: score * weights[0] for idx, score in feature_recs}
         menu_scores = {idx: score * weights[1] for idx, score in menu_recs}
@@ -338,6 +310,56 @@ class DualRecommender:
             reverse=True
         )[:10]
 
+    def recommend_from_similarities(self, selected_indices, feature_similarities, menu_similarities=None,
+                                    quality_scores=None, weights=BLEND_WEIGHTS, min_votes=None):
+        """Blend precomputed similarity vectors with quality scores and combine the top picks.
+
+        Equivalent to feature_based_recommendations / menu_based_recommendations
+        followed by combine_recommendations, for callers that maintain the
+        similarity vectors themselves. `quality_scores`, `weights` and
+        `min_votes` override the production blend, e.g. for shadow scoring.
+        """
+        if quality_scores is None:
+            quality_scores = self.quality_scores
+        feature_recs = []
+        if selected_indices:
+            feature_recs = self._get_top_recommendations(
+                feature_similarities * quality_scores, selected_indices, 20, min_votes)
+        menu_recs = []
+        if menu_similarities is not None:
+            menu_recs = self._get_top_recommendations(menu_similarities * quality_scores, [], 10, min_votes)
+        return self.combine_recommendations(feature_recs, menu_recs, weights)
+
+    def memory_report(self):
+        """Break down the memory held by the recommender, in bytes per component"""
+        report = {}
+
+        for column, size in self.df.memory_usage(index=False, deep=True).items():
+            report[f'df.{column}'] = int(size)
+
+        for name, value in self.__dict__.items():
+            if isinstance(value, np.ndarray):
+                report[name] = value.nbytes
+            elif hasattr(value, 'indptr'):
+                report[name] = value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+            elif isinstance(value, StringTable):
+                report[name] = value.nbytes
+            elif isinstance(value, list):
+                report[name] = sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+            elif isinstance(value, dict):
+                report[name] = sys.getsizeof(value) + sum(
+                    sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items())
+            elif isinstance(value, TfidfVectorizer):
+                vocabulary = value.vocabulary_
+                report[name] = (
+                    sys.getsizeof(vocabulary) +
+                    sum(sys.getsizeof(term) + sys.getsizeof(idx) for term, idx in vocabulary.items()) +
+                    value.idf_.nbytes
+                )
+
+        report['total'] = sum(report.values())
+        return report
+
     def get_recommendations(self):
       """Interactive recommendation process"""
       print("\n🍽️ Welcome to the Restaurant Recommender!")
@@ -388,14 +410,13 @@ class DualRecommender:
 
       for idx, score in final_recommendations:
           restaurant = self.df.iloc[idx]
-          sentiments = restaurant['sentiment_scores']
           print(f"\n📍 {restaurant['name']}")
           print(f"   {restaurant['address']}")
           print(f"🍳 Cuisines: {restaurant['cuisines']}")
           print(f"👥 Votes: {restaurant['votes']}")
           print(f"💰 Average Cost: ₹{restaurant['avg_price']:.0f}")
-          print(f"👍 Positive Reviews: {sentiments['positive_ratio']*100:.1f}%")
-          print(f"📊 Total Reviews: {sentiments['total_reviews']}")
+          print(f"👍 Positive Reviews: {restaurant['positive_ratio']*100:.1f}%")
+          print(f"📊 Total Reviews: {restaurant['total_reviews']}")
           if restaurant['highlights']:
               print(f"✨ Highlights: {restaurant['highlights']}")
           print(f"⭐ Similarity Score: {score:.2f}")
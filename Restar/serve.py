@@ -0,0 +1,108 @@
+# serve.py
+#
+# Multi-worker launcher: builds (or reuses) the model once, publishes it as
+# memory-mapped segments and starts uvicorn workers that attach to them.
+#
+#   python -m Restar.serve --workers 4
+
+import argparse
+import glob
+import logging
+import os
+import threading
+import time
+
+import uvicorn
+
+from Restar.cache import STATE_DB_ENV
+from Restar.etl import find_catalog
+from Restar.shared_model import MODEL_DIR_ENV, build_or_attach, default_model_dir, process_memory
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _worker_pids():
+    """List the uvicorn workers among the direct children of this process"""
+    pids = set()
+    for path in glob.glob('/proc/self/task/*/children'):
+        try:
+            with open(path) as f:
+                pids.update(int(pid) for pid in f.read().split())
+        except OSError:
+            continue
+
+    workers = []
+    for pid in sorted(pids):
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        # multiprocessing also starts a resource tracker as a child
+        if b'resource_tracker' not in cmdline:
+            workers.append(pid)
+    return workers
+
+
+def _report_memory(interval):
+    """Periodically log resident, private, file-backed and shared memory of every worker.
+
+    The mmapped model segments show up as shared memory when published on
+    tmpfs (/dev/shm) and as file-backed memory on a regular filesystem.
+    """
+    while True:
+        time.sleep(interval)
+        for pid in _worker_pids():
+            usage = process_memory(pid)
+            logger.info(
+                f"worker {pid}: rss={usage.get('rss_bytes', 0) / 2**20:.1f} MiB "
+                f"private={usage.get('private_bytes', 0) / 2**20:.1f} MiB "
+                f"file={usage.get('file_backed_bytes', 0) / 2**20:.1f} MiB "
+                f"shared={usage.get('shared_memory_bytes', 0) / 2**20:.1f} MiB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the recommender API with a shared read-only model")
+    parser.add_argument('--csv', default=find_catalog(), help="catalog (CSV or Parquet) used to build the model")
+    parser.add_argument('--model-dir', default=default_model_dir(), help="where the shared segments are published")
+    parser.add_argument('--state-db', default=None,
+                        help="SQLite file for request state shared by the workers (default: next to the model)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--rebuild', action='store_true', help="rebuild even if the published model is up to date")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="processes used to parse the catalog when building (-1 for all cores)")
+    parser.add_argument('--build-only', action='store_true', help="build and publish the model, then exit")
+    parser.add_argument('--report-interval', type=float, default=60,
+                        help="seconds between per-worker memory reports (0 disables)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    model_dir = build_or_attach(args.csv, args.model_dir, rebuild=args.rebuild, n_jobs=args.jobs)
+    logger.info(f"Model ready in {time.perf_counter() - started:.1f}s at {model_dir}")
+    if args.build_only:
+        return
+
+    # Workers inherit the environment and attach instead of rebuilding
+    os.environ[MODEL_DIR_ENV] = model_dir
+
+    # Follow-up requests (similar-dish pages, sessions) can reach any worker, so
+    # their state goes into one database; start each launch with an empty one
+    state_db = args.state_db or f'{model_dir}-state.db'
+    for path in (state_db, state_db + '-wal', state_db + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    os.environ[STATE_DB_ENV] = state_db
+
+    if args.report_interval > 0:
+        threading.Thread(target=_report_memory, args=(args.report_interval,), daemon=True).start()
+
+    logger.info(f"Starting {args.workers} workers...")
+    uvicorn.run("Restar.app:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
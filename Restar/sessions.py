@@ -0,0 +1,200 @@
+import asyncio
+import uuid
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from Restar.cache import TTLCache, shared_ttl_cache
+
+
+class RunningProfile:
+    """Running sum of sparse TF-IDF rows and its dot product with every restaurant.
+
+    Adding or removing a row only touches that row's terms and the matching
+    rows of the term-major catalog matrix, so each update costs O(delta)
+    rather than a full similarity pass.
+    """
+
+    def __init__(self, term_rows):
+        self.term_rows = term_rows  # CSR of the transposed catalog matrix: cheap access to the rows of a term
+        self.terms = {}
+        self.norm_sq = 0.0
+        self.dot = np.zeros(term_rows.shape[1])
+
+    def update(self, row, sign=1):
+        indices, data = row.indices, row.data * sign
+        overlap = sum(self.terms.get(term, 0.0) * weight for term, weight in zip(indices, data))
+        # |s + r|^2 = |s|^2 + 2 s.r + |r|^2 (with r negated for removals)
+        self.norm_sq = max(self.norm_sq + 2 * overlap + float(row.data @ row.data), 0.0)
+        for term, weight in zip(indices, data):
+            total = self.terms.get(term, 0.0) + weight
+            if abs(total) < 1e-12:
+                self.terms.pop(term, None)
+            else:
+                self.terms[term] = total
+        self.dot += self.term_rows[indices].T @ data
+
+    def reset(self):
+        """Start from an exact zero instead of accumulating rounding error"""
+        self.terms.clear()
+        self.norm_sq = 0.0
+        self.dot[:] = 0
+
+    def similarities(self):
+        """Cosine similarity of every (L2-normalized) catalog row with the running sum"""
+        if self.norm_sq <= 0:
+            return np.zeros_like(self.dot)
+        return self.dot / np.sqrt(self.norm_sq)
+
+
+class RecommendationSession:
+    """One worker's copy of a user's selection, with scores kept up to date as it changes.
+
+    The selection itself lives in the store's shared state; `version` tells
+    whether this copy still matches it. Requests on one session are
+    serialized with `lock` within a worker, so their updates never interleave
+    inside the running profiles.
+    """
+
+    def __init__(self, session_id, store):
+        self.session_id = session_id
+        self.store = store
+        self.lock = asyncio.Lock()
+        self.version = None  # version of the shared state this copy reflects, None when stale
+        self.restaurants = []  # selected row indices, in selection order
+        self.dishes = []
+        self.feature_profile = RunningProfile(store.recommender.feature_terms)
+        self.menu_profile = RunningProfile(store.recommender.menu_terms)
+
+    def add_restaurant(self, idx):
+        self.restaurants.append(idx)
+        self.feature_profile.update(self.store.recommender.feature_matrix[idx])
+
+    def remove_restaurant(self, idx):
+        """Remove one selection of row `idx`; returns False if it was not selected"""
+        if idx not in self.restaurants:
+            return False
+        self.restaurants.remove(idx)
+        if self.restaurants:
+            self.feature_profile.update(self.store.recommender.feature_matrix[idx], sign=-1)
+        else:
+            self.feature_profile.reset()
+        return True
+
+    def add_dish(self, dish):
+        self.dishes.append(dish)
+        self.menu_profile.update(self.store.menu_vector(dish))
+
+    def remove_dish(self, dish):
+        """Remove one occurrence of `dish`; returns False if it was not in the session"""
+        if dish not in self.dishes:
+            return False
+        self.dishes.remove(dish)
+        if self.dishes:
+            self.menu_profile.update(self.store.menu_vector(dish), sign=-1)
+        else:
+            self.menu_profile.reset()
+        return True
+
+    def state(self):
+        return {'restaurants': [int(idx) for idx in self.restaurants], 'dishes': list(self.dishes),
+                'version': self.version}
+
+    def load(self, state):
+        """Rebuild the profiles from a selection another worker may have changed"""
+        self.restaurants, self.dishes = [], []
+        self.feature_profile.reset()
+        self.menu_profile.reset()
+        for idx in state['restaurants']:
+            self.add_restaurant(idx)
+        for dish in state['dishes']:
+            self.add_dish(dish)
+        self.version = state['version']
+
+    def recommendations(self):
+        """Top 10 (index, score) pairs for the current selection"""
+        menu_similarities = self.menu_profile.similarities() if self.dishes else None
+        return self.store.recommender.recommend_from_similarities(
+            self.restaurants, self.feature_profile.similarities(), menu_similarities)
+
+
+class SessionStore:
+    """Bounded, expiring store of recommendation sessions over one recommender.
+
+    Selections are kept in a shared_ttl_cache, so any worker can serve any
+    session; each worker keeps its own RecommendationSession per session and
+    replays the selection into it when another worker has changed it.
+    """
+
+    def __init__(self, recommender, maxsize=1000, ttl=1800):
+        self.recommender = recommender
+        self.states = shared_ttl_cache('sessions', maxsize, ttl)
+        self.sessions = TTLCache(maxsize, ttl)
+
+    def menu_vector(self, dish):
+        """Un-normalized TF-IDF row of a dish.
+
+        Unlike the normalized vectors these add up: the sum over dishes equals
+        the raw vector of the joined query used by menu_based_recommendations.
+        """
+        vectorizer = self.recommender.menu_vectorizer
+        counts = CountVectorizer.transform(vectorizer, [dish])
+        return counts.multiply(vectorizer.idf_).tocsr()
+
+    def create(self):
+        session = RecommendationSession(uuid.uuid4().hex, self)
+        session.version = 0
+        self.states.set(session.session_id, session.state())
+        self.sessions.set(session.session_id, session)
+        return session
+
+    def local(self, session_id):
+        """This worker's copy of a session, created empty if it has none yet.
+
+        Does no I/O, so it can run on the event loop; `refresh` or `update`
+        then bring the copy in line with the shared state.
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = RecommendationSession(session_id, self)
+            self.sessions.set(session_id, session)
+        return session
+
+    def refresh(self, session):
+        """Sync a local copy with the shared state; returns False if the session is gone"""
+        state = self.states.get(session.session_id)
+        if state is None:
+            self.sessions.pop(session.session_id)
+            return False
+        if state['version'] != session.version:
+            session.load(state)
+        return True
+
+    def update(self, session, apply):
+        """Apply `apply(session)` and publish the new selection; returns False if the session is gone.
+
+        The shared state stays locked from reading the selection to writing it
+        back, so updates from different workers cannot overwrite each other.
+        """
+        with self.states.locked(session.session_id) as holder:
+            if holder.value is None:
+                self.sessions.pop(session.session_id)
+                return False
+            if holder.value['version'] != session.version:
+                session.load(holder.value)
+            try:
+                apply(session)
+            except BaseException:
+                # The profiles may be half updated; rebuild them on the next request
+                session.version = None
+                raise
+            session.version = holder.value['version'] + 1
+            holder.value = session.state()
+        return True
+
+    def delete(self, session_id):
+        self.sessions.pop(session_id)
+        return self.states.pop(session_id) is not None
+
+    def __len__(self):
+        return len(self.states)
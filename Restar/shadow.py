@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from Restar.recommender import BLEND_WEIGHTS, QUALITY_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+SHADOW_CONFIG_ENV = "WHERETODINE_SHADOW_CONFIG"
+
+
+class WeightConfig:
+    """A named alternative to the production blend"""
+
+    def __init__(self, name, feature_weight=BLEND_WEIGHTS[0], menu_weight=BLEND_WEIGHTS[1],
+                 quality_weights=QUALITY_WEIGHTS, min_votes=None):
+        self.name = name
+        self.weights = (float(feature_weight), float(menu_weight))
+        self.quality_weights = tuple(float(weight) for weight in quality_weights)
+        if len(self.quality_weights) != 3:
+            raise ValueError(f"{name}: quality_weights needs 3 values (positive ratio, votes, reviews)")
+        self.min_votes = min_votes
+
+
+class ShadowScorer:
+    """Ranks sampled requests under alternative weight configs next to production.
+
+    Only the blend and top-k stages are recomputed; the similarity vectors of
+    the production ranking are reused. The request thread only samples and
+    queues; a background thread scores the configs and appends the records to
+    `log_path` as JSON lines. Requests are dropped rather than blocking when
+    that thread falls behind, and skipped when the estimated cost of scoring
+    them exceeds `budget_ms`. The log is opened up front, so an unwritable
+    path raises OSError here instead of stopping the scorer.
+    """
+
+    # Weight of the latest measurement in the running cost estimates
+    COST_SMOOTHING = 0.1
+
+    def __init__(self, recommender, configs, log_path, sample_rate=1.0, budget_ms=5.0, queue_size=1000):
+        self.recommender = recommender
+        self.configs = configs
+        self.log_path = log_path
+        self.sample_rate = sample_rate
+        self.budget = budget_ms / 1000
+        # Quality vectors are request independent, so they are blended once per config
+        self.quality_scores = {config.name: recommender.compute_quality_scores(config.quality_weights)
+                               for config in configs}
+        self.costs = self._calibrate()
+
+        self.records = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'sampled': 0, 'scored': 0, 'configs_scored': 0, 'over_budget': 0,
+                         'logged': 0, 'dropped': 0, 'write_errors': 0}
+        self.overhead_total = 0.0
+        self.overhead_max = 0.0
+        # One unbuffered append per record keeps lines whole when several workers share the log
+        self.log = open(log_path, 'ab', buffering=0)
+        threading.Thread(target=self._score_records, daemon=True).start()
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _score(self, config, selected_indices, feature_similarities, menu_similarities):
+        return self.recommender.recommend_from_similarities(
+            selected_indices, feature_similarities, menu_similarities,
+            quality_scores=self.quality_scores[config.name], weights=config.weights,
+            min_votes=config.min_votes)
+
+    def _calibrate(self, repeats=3):
+        """Seconds each config takes to score, with and without menu similarities"""
+        similarities = np.zeros(len(self.recommender.df))
+        costs = {}
+        for config in self.configs:
+            for menu_similarities in (None, similarities):
+                timings = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    self._score(config, [0], similarities, menu_similarities)
+                    timings.append(time.perf_counter() - started)
+                costs[config.name, menu_similarities is not None] = min(timings)
+        return costs
+
+    def estimated_cost(self, with_menu):
+        return sum(self.costs[config.name, with_menu] for config in self.configs)
+
+    def observe(self, restaurants, favorite_dishes, selected_indices, feature_similarities, menu_similarities,
+                production):
+        """Queue one request to be ranked under every config, if it is sampled and fits in the budget"""
+        self._count('requests')
+        if random.random() >= self.sample_rate:
+            return
+        self._count('sampled')
+        if self.estimated_cost(menu_similarities is not None) > self.budget:
+            self._count('over_budget')
+            return
+
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'restaurants': list(restaurants),
+            'favorite_dishes': list(favorite_dishes),
+            'production': production,
+        }
+        try:
+            self.records.put_nowait((record, selected_indices, feature_similarities, menu_similarities))
+        except queue.Full:
+            self._count('dropped')
+
+    def _shadow_rankings(self, selected_indices, feature_similarities, menu_similarities):
+        """Score every config, refreshing the cost estimates with the measured times"""
+        shadows = {}
+        for config in self.configs:
+            started = time.perf_counter()
+            shadows[config.name] = self._score(config, selected_indices, feature_similarities, menu_similarities)
+            key = config.name, menu_similarities is not None
+            self.costs[key] += self.COST_SMOOTHING * (time.perf_counter() - started - self.costs[key])
+        return shadows
+
+    def _ranking(self, recommendations):
+        names = self.recommender.df['name']
+        return [{'index': idx, 'name': str(names.iloc[idx]), 'score': float(score)} for idx, score in recommendations]
+
+    def _format(self, record):
+        # Names are resolved here, off the request thread
+        record['production'] = self._ranking(record['production'])
+        production = [entry['index'] for entry in record['production']]
+        for name, ranking in record['shadows'].items():
+            ranking = self._ranking(ranking)
+            shadow = [entry['index'] for entry in ranking]
+            overlap = len(set(shadow) & set(production)) / max(len(production), 1)
+            record['shadows'][name] = {'ranking': ranking, 'overlap': overlap,
+                                       'same_top': bool(shadow[:1] == production[:1])}
+        return (json.dumps(record) + '\n').encode()
+
+    def _score_records(self):
+        while True:
+            record, selected_indices, feature_similarities, menu_similarities = self.records.get()
+            # A bad record is counted and logged, never allowed to stop the scorer
+            try:
+                started = time.perf_counter()
+                record['shadows'] = self._shadow_rankings(selected_indices, feature_similarities, menu_similarities)
+                elapsed = time.perf_counter() - started
+                record['overhead_ms'] = elapsed * 1000
+                with self.lock:
+                    self.counters['scored'] += 1
+                    self.counters['configs_scored'] += len(record['shadows'])
+                    self.overhead_total += elapsed
+                    self.overhead_max = max(self.overhead_max, elapsed)
+                self.log.write(self._format(record))
+                self._count('logged')
+            except Exception:
+                self._count('write_errors')
+                logger.exception(f"Failed to score or write shadow ranking to {self.log_path}")
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['overhead_ms_mean'] = self.overhead_total * 1000 / stats['scored'] if stats['scored'] else 0.0
+            stats['overhead_ms_max'] = self.overhead_max * 1000
+        stats['queued'] = self.records.qsize()
+        stats['estimated_ms'] = {'features': self.estimated_cost(False) * 1000,
+                                 'features_and_menu': self.estimated_cost(True) * 1000}
+        stats['configs'] = [config.name for config in self.configs]
+        return stats
+
+
+def load_shadow_scorer(recommender, path=None):
+    """Build a ShadowScorer from the JSON file named by WHERETODINE_SHADOW_CONFIG, if set.
+
+    The file looks like::
+
+        {"log_path": "shadow.jsonl", "sample_rate": 0.1, "budget_ms": 5,
+         "configs": [{"name": "menu_heavy", "feature_weight": 0.5, "menu_weight": 0.5},
+                     {"name": "strict", "min_votes": 100, "quality_weights": [0.6, 0.2, 0.2]}]}
+    """
+    path = path or os.environ.get(SHADOW_CONFIG_ENV)
+    if not path:
+        return None
+    with open(path) as f:
+        settings = json.load(f)
+    configs = [WeightConfig(**config) for config in settings.get('configs', [])]
+    if not configs:
+        logger.warning(f"No shadow configs in {path}; shadow scoring disabled.")
+        return None
+
+    log_path = settings.get('log_path', 'shadow_rankings.jsonl')
+    if not os.path.isabs(log_path):
+        log_path = os.path.join(os.path.dirname(os.path.abspath(path)), log_path)
+    try:
+        scorer = ShadowScorer(recommender, configs, log_path,
+                              sample_rate=settings.get('sample_rate', 1.0),
+                              budget_ms=settings.get('budget_ms', 5.0),
+                              queue_size=settings.get('queue_size', 1000))
+    except OSError:
+        logger.exception(f"Cannot open shadow log {log_path}; shadow scoring disabled.")
+        return None
+    logger.info(f"Shadow scoring {[config.name for config in configs]} on "
+                f"{scorer.sample_rate:.0%} of requests, logging to {log_path}")
+    if scorer.estimated_cost(True) > scorer.budget:
+        logger.warning(f"Shadow configs are estimated at {scorer.estimated_cost(False) * 1000:.1f} ms "
+                       f"({scorer.estimated_cost(True) * 1000:.1f} ms with favorite dishes), over the "
+                       f"{scorer.budget * 1000:g} ms budget; requests over it will not be scored.")
+    return scorer
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, issparse
+
+from Restar.etl import read_catalog
+from Restar.recommender import DualRecommender
+from Restar.strings import StringTable
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR_ENV = "WHERETODINE_MODEL_DIR"
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = "state.pkl"
+# Bump whenever the published layout or the recommender's attributes change,
+# so segments left behind by an older build are rebuilt instead of attached
+MODEL_FORMAT_VERSION = 7
+
+
+def default_model_dir():
+    """Prefer tmpfs (/dev/shm) so the published segments live in shared memory"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'wheretodine-model')
+
+
+def _source_signature(csv_path):
+    """Identify a dataset file by path, size and modification time"""
+    stat = os.stat(csv_path)
+    return {
+        'path': os.path.abspath(csv_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def is_fresh(model_dir, csv_path):
+    """Check whether the published model was built from the current dataset"""
+    manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+        return False
+    return manifest.get('source') == _source_signature(csv_path)
+
+
+def _save_strings(table, directory, name):
+    np.save(os.path.join(directory, f'{name}.data.npy'), table.data)
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), table.offsets)
+
+
+def _load_strings(directory, name):
+    return StringTable(np.load(os.path.join(directory, f'{name}.data.npy'), mmap_mode='r'),
+                       np.load(os.path.join(directory, f'{name}.offsets.npy'), mmap_mode='r'))
+
+
+def _publish_frame(frame, directory, name):
+    """Store every column as arrays: numeric values as is, strings as category codes plus labels"""
+    columns = []
+    for position, column in enumerate(frame.columns):
+        values = frame[column]
+        prefix = f'{name}.{position}'
+        if values.dtype == object:
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(directory, f'{prefix}.codes.npy'), values.cat.codes.to_numpy())
+            _save_strings(StringTable.from_strings(values.cat.categories), directory, f'{prefix}.categories')
+            columns.append({'name': column, 'kind': 'categorical', 'ordered': bool(values.cat.ordered)})
+        else:
+            np.save(os.path.join(directory, f'{prefix}.npy'), values.to_numpy())
+            columns.append({'name': column, 'kind': 'array'})
+    return {'columns': columns}
+
+
+def _attach_frame(directory, name, meta):
+    """Rebuild a frame whose columns are backed by the memory-mapped arrays (copy=False keeps them unconsolidated)"""
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        prefix = f'{name}.{position}'
+        if column['kind'] == 'categorical':
+            # pandas needs the labels as Python strs, so only they are materialized per worker
+            data[column['name']] = pd.Categorical.from_codes(
+                np.load(os.path.join(directory, f'{prefix}.codes.npy'), mmap_mode='r'),
+                categories=list(_load_strings(directory, f'{prefix}.categories')), ordered=column['ordered'])
+        else:
+            data[column['name']] = np.load(os.path.join(directory, f'{prefix}.npy'), mmap_mode='r')
+    return pd.DataFrame(data, copy=False)
+
+
+def publish_model(recommender, model_dir, csv_path=None):
+    """Write a fitted recommender to `model_dir` as read-only segments.
+
+    Sparse matrices, numpy arrays, string tables and the columns of the frame
+    are stored as .npy files so every worker can memory-map the same pages.
+    Only the rest (the fitted vectorizers, scalars and build timings) is
+    pickled and loaded privately by each worker, together with the frame's
+    category labels, which pandas needs as Python strs.
+    """
+    tmp_dir = model_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {'format_version': MODEL_FORMAT_VERSION, 'matrices': {}, 'arrays': [], 'strings': [],
+                'frames': {}, 'source': _source_signature(csv_path) if csv_path else None}
+    state = {}
+    for name, value in recommender.__dict__.items():
+        if issparse(value):
+            matrix = value.tocsr()
+            for part in ('data', 'indices', 'indptr'):
+                np.save(os.path.join(tmp_dir, f'{name}.{part}.npy'), getattr(matrix, part))
+            manifest['matrices'][name] = {'shape': list(matrix.shape)}
+        elif isinstance(value, np.ndarray):
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), value)
+            manifest['arrays'].append(name)
+        elif isinstance(value, StringTable):
+            _save_strings(value, tmp_dir, name)
+            manifest['strings'].append(name)
+        elif isinstance(value, pd.DataFrame):
+            manifest['frames'][name] = _publish_frame(value, tmp_dir, name)
+        else:
+            state[name] = value
+    with open(os.path.join(tmp_dir, STATE_FILE), 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Manifest goes last so a half-written directory is never treated as fresh
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(model_dir, ignore_errors=True)
+    os.rename(tmp_dir, model_dir)
+    logger.info(f"Published model to {model_dir}")
+
+
+def attach_model(model_dir):
+    """Rebuild a DualRecommender on top of the published, memory-mapped segments"""
+    with open(os.path.join(model_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+        raise ValueError(f"Model at {model_dir} has format version {manifest.get('format_version')}, "
+                         f"expected {MODEL_FORMAT_VERSION}; republish it with `python -m Restar.serve --rebuild`")
+    with open(os.path.join(model_dir, STATE_FILE), 'rb') as f:
+        state = pickle.load(f)
+
+    recommender = DualRecommender.__new__(DualRecommender)
+    recommender.__dict__.update(state)
+
+    for name, meta in manifest['matrices'].items():
+        parts = [
+            np.load(os.path.join(model_dir, f'{name}.{part}.npy'), mmap_mode='r')
+            for part in ('data', 'indices', 'indptr')
+        ]
+        setattr(recommender, name, csr_matrix(tuple(parts), shape=tuple(meta['shape']), copy=False))
+    for name in manifest['arrays']:
+        setattr(recommender, name, np.load(os.path.join(model_dir, f'{name}.npy'), mmap_mode='r'))
+    for name in manifest['strings']:
+        setattr(recommender, name, _load_strings(model_dir, name))
+    for name, meta in manifest['frames'].items():
+        setattr(recommender, name, _attach_frame(model_dir, name, meta))
+
+    logger.info(f"Attached to shared model at {model_dir}")
+    return recommender
+
+
+def build_or_attach(csv_path, model_dir=None, rebuild=False, n_jobs=1):
+    """Publish the model from `csv_path` unless an up-to-date copy already exists"""
+    model_dir = model_dir or default_model_dir()
+    if rebuild or not is_fresh(model_dir, csv_path):
+        df = read_catalog(csv_path)
+        publish_model(DualRecommender(df, n_jobs=n_jobs), model_dir, csv_path)
+    return model_dir
+
+
+def process_memory(pid='self'):
+    """Return resident memory of a process in bytes, split into private and shared parts"""
+    fields = {
+        'VmRSS': 'rss_bytes',
+        'RssAnon': 'private_bytes',
+        'RssFile': 'file_backed_bytes',
+        'RssShmem': 'shared_memory_bytes',
+    }
+    usage = {'pid': os.getpid() if pid == 'self' else pid}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        # Non-Linux fallback: only the peak RSS is available
+        import resource
+        usage['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
@@ -0,0 +1,47 @@
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts `func` in the threadpool; callers that
+    arrive while it is running await the same task and share its result or
+    exception. Nothing is kept once the call completes, so this is not a cache.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, *args):
+        self.requests += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(run_in_threadpool(func, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        # Shielded so one disconnecting client does not cancel the others' result
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._in_flight),
+        }
@@ -0,0 +1,243 @@
+# static_assets.py
+#
+# Build step and server for the front end in Restar/.
+#
+#   python -m Restar.static_assets          # fingerprint + precompress into Restar/.static_build
+#
+# Assets are copied as name.<hash>.ext and the references in CSS and HTML are
+# rewritten to those names, so they can be cached forever. HTML pages keep
+# their names and are revalidated with ETags instead.
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SITE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUILD_DIR = os.path.join(SITE_DIR, '.static_build')
+STATIC_DIR_ENV = "WHERETODINE_STATIC_DIR"
+MANIFEST_FILE = 'manifest.json'
+
+ASSET_DIRS = ['assets/css', 'assets/js', 'assets/fonts', 'assets/img']
+SKIP_DIRS = {'node_modules'}
+SKIP_FILES = {'server.js', 'package.json', 'package-lock.json'}  # Node auth backend, not front end
+ASSET_EXTENSIONS = {
+    '.css', '.js', '.json', '.map', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico',
+    '.woff', '.woff2', '.ttf', '.eot', '.otf',
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.map', '.svg', '.ttf', '.eot', '.otf', '.ico'}
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+HTML_REFERENCE = re.compile(r'''(\b(?:src|href|data-bg-src|data-src|poster)=)(["'])([^"']+)\2''')
+CSS_REFERENCE = re.compile(r'''url\(\s*(["']?)([^"')]+)\1\s*\)''')
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _fingerprinted_name(path, digest):
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{digest}{ext}'
+
+
+def _collect_sources(site_dir):
+    """Front-end files to publish, as paths relative to `site_dir`"""
+    pages, assets = [], []
+    for name in sorted(os.listdir(site_dir)):
+        ext = os.path.splitext(name)[1].lower()
+        if not os.path.isfile(os.path.join(site_dir, name)):
+            continue
+        if ext == '.html':
+            pages.append(name)
+        elif ext in ASSET_EXTENSIONS:
+            assets.append(name)
+
+    for asset_dir in ASSET_DIRS:
+        for root, dirs, files in os.walk(os.path.join(site_dir, asset_dir)):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(files):
+                if name in SKIP_FILES or os.path.splitext(name)[1].lower() not in ASSET_EXTENSIONS:
+                    continue
+                assets.append(os.path.relpath(os.path.join(root, name), site_dir).replace(os.sep, '/'))
+    return pages, assets
+
+
+def _rewrite(text, pattern, group, base_dir, fingerprints):
+    """Point local references matched by `pattern` at their fingerprinted copies"""
+    def replace(match):
+        reference = match.group(group)
+        if re.match(r'^(?:[a-z]+:|//|#|/)', reference, flags=re.IGNORECASE):
+            return match.group(0)
+        path, suffix = re.match(r'^([^?#]*)(.*)$', reference).groups()
+        target = os.path.normpath(os.path.join(base_dir, path)).replace(os.sep, '/')
+        if target not in fingerprints:
+            return match.group(0)
+        new_reference = os.path.join(os.path.dirname(path), os.path.basename(fingerprints[target])).replace(os.sep, '/')
+        start, end = (offset - match.start(0) for offset in match.span(group))
+        whole = match.group(0)
+        return whole[:start] + new_reference + suffix + whole[end:]
+
+    return pattern.sub(replace, text)
+
+
+def _write_variants(build_dir, relative_path, data):
+    """Write a file plus its gzip/brotli variants when they are worth it"""
+    target = os.path.join(build_dir, relative_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+
+    encodings = {}
+    if os.path.splitext(relative_path)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+        variants = [('gzip', '.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.insert(0, ('br', '.br', lambda raw: brotli.compress(raw, quality=11)))
+        for encoding, suffix, compress in variants:
+            compressed = compress(data)
+            if len(compressed) < 0.9 * len(data):
+                with open(target + suffix, 'wb') as f:
+                    f.write(compressed)
+                encodings[encoding] = relative_path + suffix
+    return encodings
+
+
+def build(site_dir=SITE_DIR, build_dir=DEFAULT_BUILD_DIR):
+    """Fingerprint, rewrite and precompress the site into `build_dir`"""
+    if brotli is None:
+        logger.warning("brotli is not installed; building gzip variants only (pip install brotli)")
+    tmp_dir = build_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    pages, assets = _collect_sources(site_dir)
+    fingerprints, files = {}, {}
+
+    def publish(logical, data, immutable_name=None):
+        digest = _content_hash(data)
+        stored = immutable_name or logical
+        encodings = _write_variants(tmp_dir, stored, data)
+        entry = {'path': stored, 'etag': digest, 'encodings': encodings,
+                 'content_type': mimetypes.guess_type(logical)[0] or 'application/octet-stream'}
+        files[stored] = dict(entry, immutable=immutable_name is not None)
+        if immutable_name:
+            # The logical name stays reachable for references the build cannot see (e.g. built in JS)
+            files[logical] = dict(entry, immutable=False)
+
+    # CSS goes last so the fonts and images it references are already fingerprinted
+    for asset in sorted(assets, key=lambda path: path.endswith('.css')):
+        with open(os.path.join(site_dir, asset), 'rb') as f:
+            data = f.read()
+        if asset.endswith('.css'):
+            text = data.decode('utf-8', errors='surrogateescape')
+            text = _rewrite(text, CSS_REFERENCE, 2, os.path.dirname(asset), fingerprints)
+            data = text.encode('utf-8', errors='surrogateescape')
+        fingerprints[asset] = _fingerprinted_name(asset, _content_hash(data))
+        publish(asset, data, fingerprints[asset])
+
+    for page in pages:
+        with open(os.path.join(site_dir, page), 'rb') as f:
+            text = f.read().decode('utf-8', errors='surrogateescape')
+        text = _rewrite(text, HTML_REFERENCE, 3, os.path.dirname(page), fingerprints)
+        publish(page, text.encode('utf-8', errors='surrogateescape'))
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({'files': files}, f, indent=1, sort_keys=True)
+
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.rename(tmp_dir, build_dir)
+    logger.info(f"Built {len(pages)} pages and {len(assets)} assets into {build_dir}")
+    return build_dir
+
+
+def _accepted_encodings(header):
+    """Encodings the client accepts, from an Accept-Encoding header"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = re.search(r'q=([0-9.]+)', params)
+        if name and (quality is None or float(quality.group(1)) > 0):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticSite:
+    """Serves a build produced by `build()` with long-lived caching and precompressed variants"""
+
+    def __init__(self, build_dir):
+        self.build_dir = build_dir
+        with open(os.path.join(build_dir, MANIFEST_FILE)) as f:
+            self.files = json.load(f)['files']
+
+    def response(self, path, request: Request):
+        entry = self.files.get(path or 'index.html')
+        if entry is None:
+            return Response(status_code=404)
+
+        # Byte ranges are always served from the identity representation
+        encoding = None
+        if 'range' not in request.headers:
+            accepted = _accepted_encodings(request.headers.get('accept-encoding', ''))
+            encoding = next((name for name in ('br', 'gzip') if name in entry['encodings'] and name in accepted), None)
+
+        etag = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+        headers = {
+            'etag': etag,
+            'cache-control': IMMUTABLE_CACHE if entry['immutable'] else REVALIDATE_CACHE,
+        }
+        if entry['encodings']:
+            headers['vary'] = 'Accept-Encoding'
+
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+
+        stored = entry['path']
+        if encoding:
+            headers['content-encoding'] = encoding
+            stored = entry['encodings'][encoding]
+
+        # FileResponse handles Range requests. uvicorn does not implement the
+        # http.response.pathsend extension, so the file is read and sent in chunks
+        # through the worker; put a sendfile-capable proxy in front for zero-copy sends.
+        return FileResponse(os.path.join(self.build_dir, stored), media_type=entry['content_type'], headers=headers)
+
+
+def load_site():
+    """Load the built site if the build step has been run, else None"""
+    build_dir = os.environ.get(STATIC_DIR_ENV, DEFAULT_BUILD_DIR)
+    if not os.path.exists(os.path.join(build_dir, MANIFEST_FILE)):
+        logger.info(f"No static build at {build_dir}; run `python -m Restar.static_assets` to serve the site.")
+        return None
+    return StaticSite(build_dir)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the WhereToDine front end")
+    parser.add_argument('--site-dir', default=SITE_DIR)
+    parser.add_argument('--build-dir', default=DEFAULT_BUILD_DIR)
+    args = parser.parse_args()
+    build(args.site_dir, args.build_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import bisect
+
+import numpy as np
+
+
+class StringTable:
+    """Read-only sequence of strings packed into one UTF-8 buffer.
+
+    String i is data[offsets[i]:offsets[i + 1]], so a table is two arrays
+    instead of one Python object per string, and can be memory-mapped and
+    shared between workers like the other model arrays.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data  # uint8
+        self.offsets = offsets  # int64, one more than the number of strings
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [str(string).encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('string table index out of range')
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+    def position(self, value):
+        """Index of `value` in a table sorted by code point, or None"""
+        index = bisect.bisect_left(self, value)
+        return index if index < len(self) and self[index] == value else None